@@ -1,8 +1,51 @@
 import streamlit as st
-import pandas as pd
-from functools import reduce
-import io
-from openpyxl.styles import Alignment, PatternFill, Border, Side
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from importlib.machinery import ModuleSpec
+from armazenamento import ArmazemQuizzes
+from consolidacao import ConsolidacaoIncremental, aplicar_porcentagem
+from diagnostico import Diagnostico, configurar_log
+from exportacao import exportar_consolidado, exportar_turma, exportar_turmas_zip, nome_arquivo_turma
+from leitura import CacheQuizzes, agregar_em_fluxo, criar_pool, eh_zip, ler_zip, nome_base_do_arquivo
+from tarefas import assinatura, tarefa_atual
+
+# O Streamlit executa este script como um módulo "__main__" sem __spec__, e aí os processos
+# de leitura (forkserver) executariam o script inteiro de novo ao iniciar. Com um spec de
+# nome "__main__" o multiprocessing não o reimporta; eles só precisam do leitura.py.
+__spec__ = ModuleSpec("__main__", None)
+
+# Quantidade máxima de quizzes agregados mantidos em memória
+MAX_QUIZZES_EM_CACHE = 256
+
+# Processos usados para ler as planilhas (1 = sequencial, 0 = todos os núcleos)
+TRABALHADORES_LEITURA = int(os.environ.get("WAYGROUND_TRABALHADORES", "0"))
+
+# Tipos compactos na tabela consolidada (categorias, inteiros pequenos, float32)
+MODO_COMPACTO = os.environ.get("WAYGROUND_COMPACTO") == "1"
+
+# Banco SQLite opcional com os quizzes já importados (ex.: dados/quizzes.sqlite).
+# Desligado por padrão: o banco é um só para o servidor, então todas as sessões veem
+# os mesmos quizzes salvos.
+CAMINHO_BANCO = os.environ.get("WAYGROUND_BANCO", "")
+
+# Quantidade máxima de quizzes no banco (os importados há mais tempo saem primeiro)
+MAX_QUIZZES_NO_BANCO = int(os.environ.get("WAYGROUND_BANCO_MAX_QUIZZES", "500"))
+
+# Threads que geram as planilhas em segundo plano (compartilhadas entre sessões)
+TRABALHADORES_EXPORTACAO = int(os.environ.get("WAYGROUND_TRABALHADORES_EXPORTACAO", "2"))
+
+# Intervalo, em segundos, entre as atualizações da barra de progresso
+INTERVALO_PROGRESSO = 0.3
+
+# Registros do painel de diagnóstico guardados por sessão (os mais antigos saem primeiro)
+MAX_REGISTROS_DIAGNOSTICO = 500
+
+# Liga a medição de memória por padrão (as linhas de log saem sempre)
+DIAGNOSTICO_MEMORIA = os.environ.get("WAYGROUND_DIAGNOSTICO_MEMORIA") == "1"
+
+configurar_log()
 
 st.set_page_config(
     page_title="Meu App",
@@ -11,36 +54,158 @@ st.set_page_config(
 
 st.title("Carregar Planilha")
 
-# Upload do arquivo
-arquivos = st.file_uploader("Selecione os arquivos", type=["xlsx"], accept_multiple_files=True)
+# Upload do arquivo (exportações .xlsx soltas ou compactadas em .zip)
+arquivos = st.file_uploader("Selecione os arquivos", type=["xlsx", "zip"], accept_multiple_files=True)
 
-dataframes = []
 
-if arquivos:
+def entradas_enviadas(arquivos):
+    # (nome_base, conteudo) de cada exportação enviada; os ZIPs são abertos um
+    # membro por vez, para não descompactar o lote inteiro de uma só vez
     for arq in arquivos:
-        nome_base = arq.name.split("-")[0]
-        df = pd.read_excel(arq, sheet_name='Participant Data')
-        df["Name"] = df["First Name"].astype(str) + " " + df["Last Name"].astype(str)
-        df = df[['Class Name', "Name", 'Accuracy']]
-        df['Accuracy'] = df['Accuracy'].astype(str).str.replace('%','').astype(float)
-        df = (
-            df.groupby(['Class Name', 'Name'])
-                .agg(
-                    **{f"Acc-{nome_base}": ('Accuracy', 'max'),
-                        f"Tentativa-{nome_base}": ('Accuracy', 'count')}
-                )
-                .reset_index()
-            )
-        dataframes.append(df)
-
-    dfFinal = reduce(lambda left, right: pd.merge(left, right, on=["Class Name", "Name"], how="outer"), dataframes)
-    dfFinal.fillna(0, inplace=True)
-
-    # Calcular ACC Total (média das médias de acurácia de cada arquivo)
-    colunas_acc = [col for col in dfFinal.columns if col.startswith('Acc-')]
-    # Calcular a média apenas das colunas de acurácia (ignorando valores NaN)
-    dfFinal['ACC Total'] = dfFinal[colunas_acc].mean(axis=1, skipna=True).round(2)
+        if eh_zip(arq.name):
+            yield from ler_zip(arq)
+        else:
+            yield nome_base_do_arquivo(arq.name), arq.getvalue()
+
+
+@st.cache_resource
+def obter_armazem():
+    return ArmazemQuizzes(CAMINHO_BANCO, max_quizzes=MAX_QUIZZES_NO_BANCO) if CAMINHO_BANCO else None
+
+
+def remover_quizzes_salvos():
+    for chave in st.session_state.quizzes_salvos:
+        armazem.remover(chave)
+    st.session_state.quizzes_salvos = []
+
+
+# Quizzes de sessões anteriores entram na consolidação sem precisar reenviar o arquivo
+armazem = obter_armazem()
+salvos = armazem.listar() if armazem is not None else None
+selecionados = []
+if salvos is not None and len(salvos):
+    descricoes = {
+        (q.hash, q.nome_base): f"{q.nome_base} ({q.importado_em[:10]}, {q.alunos} alunos)"
+        for q in salvos.itertuples()
+    }
+    selecionados = st.multiselect(
+        "Incluir quizzes já importados:",
+        list(descricoes),
+        format_func=descricoes.get,
+        key="quizzes_salvos"
+    )
+    st.button(
+        "🗑️ Apagar os selecionados do banco",
+        on_click=remover_quizzes_salvos,
+        disabled=not selecionados,
+        key="remover_quizzes_salvos"
+    )
+
+# Painel opcional com tempo, memória e contagens de cada etapa
+painel_diagnostico = st.expander("🛠️ Diagnóstico")
+medir_memoria = painel_diagnostico.checkbox(
+    "Medir pico de memória (deixa o processamento mais lento)",
+    value=DIAGNOSTICO_MEMORIA,
+    key="diagnostico_memoria"
+)
+# Um Diagnostico por sessão: as exportações terminam depois do rerun que as criou
+# (em segundo plano ou no clique) e os registros delas precisam continuar aqui
+if "diagnostico" not in st.session_state:
+    st.session_state.diagnostico = Diagnostico(max_registros=MAX_REGISTROS_DIAGNOSTICO)
+diagnostico = st.session_state.diagnostico
+diagnostico.medir_memoria = medir_memoria
+diagnostico.nova_execucao()
+
+# Cache compartilhado entre reruns e sessões, com tamanho limitado (LRU)
+@st.cache_resource
+def obter_cache_quizzes():
+    return CacheQuizzes(max_itens=MAX_QUIZZES_EM_CACHE)
+
+
+# Processos de leitura criados uma vez só e reaproveitados por todas as sessões
+# (sem pool quando a leitura é sequencial)
+@st.cache_resource
+def obter_pool_leitura():
+    trabalhadores = TRABALHADORES_LEITURA or os.cpu_count() or 1
+    return criar_pool(trabalhadores) if trabalhadores > 1 else None
+
+
+@st.cache_resource
+def obter_executor_exportacao():
+    return ThreadPoolExecutor(max_workers=TRABALHADORES_EXPORTACAO, thread_name_prefix="exportacao")
+
+
+# Mostra o progresso da planilha completa e troca pelo botão quando os bytes ficam
+# prontos. Numa execução completa o fragmento roda em paralelo (o resto da página,
+# inclusive o diagnóstico, não espera); numa reexecução de `resultados` ele é
+# chamado por último. Qualquer interação com a página interrompe a espera.
+@st.fragment(parallel=True)
+def download_consolidado(tarefa):
+    area = st.empty()
+    while not tarefa.pronta():
+        area.progress(tarefa.progresso, text="Gerando a planilha completa...")
+        time.sleep(INTERVALO_PROGRESSO)
+
+    area.download_button(
+        label="📥 Baixar Planilha Completa (XLSX)",
+        data=tarefa.resultado(),
+        file_name="dados_consolidados.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+
+# Tabela do painel de diagnóstico. Também roda em paralelo: mostra o que já foi
+# registrado e, se a planilha completa ainda estiver sendo gerada, espera ela terminar
+# (ou ser cancelada) para mostrar o registro da exportação junto.
+@st.fragment(parallel=True)
+def tabela_diagnostico(diagnostico):
+    area = st.empty()
+
+    def mostrar():
+        if diagnostico.registros:
+            area.dataframe(diagnostico.tabela(), hide_index=True)
+        else:
+            area.caption("Carregue arquivos para ver o tempo de cada etapa.")
+
+    mostrar()
+    tarefa = st.session_state.get("tarefa_exportacao_consolidada")
+    if tarefa is not None and not tarefa.pronta():
+        while not tarefa.pronta():
+            time.sleep(INTERVALO_PROGRESSO)
+        mostrar()
+
+
+# Só a turma escolhida é desenhada; trocar de turma reexecuta apenas este fragmento
+@st.fragment
+def visualizacao_turma(dfFinal, novo_input, diagnostico):
+    turmas = dfFinal['Class Name'].unique()
+    turma = st.selectbox("Escolha a turma:", list(turmas), key="turma_selecionada")
+
+    st.write(f"### Turma: {turma}")
+    df_turma = dfFinal[dfFinal['Class Name'] == turma].copy()
+    df_turma_display = df_turma.drop('Class Name', axis=1)  # Remove a coluna Class Name pois já está no título
+    st.dataframe(df_turma_display)
     
+    # Botão de download para a turma específica (a planilha é gerada no clique)
+    st.download_button(
+        label=f"📥 Baixar {turma} (XLSX)",
+        data=diagnostico.instrumentar(
+            "exportacao_turma",
+            partial(exportar_turma, df_turma, turma, turmas, novo_input),
+            turma=turma,
+            linhas=len(df_turma),
+            celulas=df_turma.size,
+        ),
+        file_name=nome_arquivo_turma(turma),
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        key="download_turma"
+    )
+
+
+# Porcentagem e média ficam num fragmento: mudar esses valores refaz só as tabelas
+# abaixo, sem reler nem reconsolidar os arquivos
+@st.fragment
+def resultados(dfFinal, diagnostico):
     # Input para porcentagem personalizada
     st.write("---")
     st.write("📊 Configurações de Cálculo:")
@@ -53,6 +218,7 @@ if arquivos:
         help="Se preenchido, será criada uma coluna 'ACC Total por [NÚMERO]%' com o valor do ACC Total multiplicado pela porcentagem"
     )
     
+    novo_input = 0
     if porcentagem_input >0:
         # Novo input embaixo do existente
         novo_input = st.number_input(
@@ -63,385 +229,107 @@ if arquivos:
             help="Media da porcentagem pra nota acima ou baixa"
         )
     
-    # Adicionar coluna personalizada se porcentagem for informada
-    if porcentagem_input > 0:
-        dfFinal[f'ACC Total por {porcentagem_input}%'] = (dfFinal['ACC Total'] * (porcentagem_input / 100)).round(2)
-    
-    # Reordenar colunas para colocar ACC Total após Name
-    colunas_ordenadas = ['Class Name', 'Name', 'ACC Total']
-    if porcentagem_input > 0:
-        colunas_ordenadas.append(f'ACC Total por {porcentagem_input}%')
-    colunas_restantes = [col for col in dfFinal.columns if col not in colunas_ordenadas]
-    dfFinal = dfFinal[colunas_ordenadas + colunas_restantes]
+    with diagnostico.etapa("colunas_derivadas") as registro:
+        dfFinal = aplicar_porcentagem(dfFinal, porcentagem_input)
+        registro["linhas"], registro["celulas"] = len(dfFinal), dfFinal.size
 
     st.write("📊 Visualização da Planilha Completa:")
     st.dataframe(dfFinal)
     
-    # Botão de download com células mescladas
-    def to_excel_with_merged_cells(df):
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Criar uma cópia do dataframe para manipulação
-            df_export = df.copy()
-            
-            # Adicionar coluna vazia para mesclar
-            df_export.insert(0, 'Class_Name_Merge', '')
-            
-            # Preencher apenas a primeira linha de cada turma
-            current_class = None
-            for idx, row in df_export.iterrows():
-                if row['Class Name'] != current_class:
-                    df_export.at[idx, 'Class_Name_Merge'] = row['Class Name']
-                    current_class = row['Class Name']
-            
-            # Remover a coluna original Class Name
-            df_export = df_export.drop('Class Name', axis=1)
-            
-            # Renomear a coluna mesclada
-            df_export = df_export.rename(columns={'Class_Name_Merge': 'Class Name'})
-            
-            # Escrever no Excel
-            df_export.to_excel(writer, index=False, sheet_name='Dados_Consolidados')
-            
-            # Obter a planilha para mesclar células
-            worksheet = writer.sheets['Dados_Consolidados']
-            
-            # Formatar cabeçalho com cor azul escuro
-            for col in range(1, len(df_export.columns) + 1):
-                header_cell = worksheet.cell(row=1, column=col)
-                header_cell.fill = PatternFill(start_color='405ddb', fill_type='solid')
-                header_cell.alignment = Alignment(horizontal='center', vertical='center')
-                header_cell.border = Border(
-                    left=Side(style='thin', color='000000'),
-                    right=Side(style='thin', color='000000'),
-                    top=Side(style='thin', color='000000'),
-                    bottom=Side(style='thin', color='000000')
-                )
-            
-            # Lista de cores para as turmas
-            cores_turmas = [
-                'FFE6E6',  # Rosa claro
-                'E6F3FF',  # Azul claro
-                'E6FFE6',  # Verde claro
-                'FFF0E6',  # Laranja claro
-                'F0E6FF',  # Roxo claro
-                'FFFFE6',  # Amarelo claro
-                'E6FFFF',  # Ciano claro
-                'FFE6F0',  # Rosa pálido
-                'F0FFE6',  # Verde pálido
-                'E6E6FF'   # Azul pálido
-            ]
-            
-            # Criar mapeamento de turmas para cores
-            turmas_unicas = df_export['Class Name'].unique()
-            turmas_unicas = [t for t in turmas_unicas if t != '']  # Remover strings vazias
-            mapeamento_cores = {turma: cores_turmas[i % len(cores_turmas)] for i, turma in enumerate(turmas_unicas)}
-            
-            # Mesclar células da coluna Class Name
-            current_class = None
-            start_row = 2  # Começar da linha 2 (após cabeçalho)
-            end_row = 2
-            
-            for idx, row in df_export.iterrows():
-                if row['Class Name'] != current_class and row['Class Name'] != '':
-                    # Mesclar células da classe anterior se existir
-                    if current_class is not None and end_row > start_row:
-                        worksheet.merge_cells(f'A{start_row}:A{end_row}')
-                        # Centralizar verticalmente e horizontalmente
-                        worksheet[f'A{start_row}'].alignment = Alignment(horizontal='center', vertical='center')
-                        # Aplicar cor da turma
-                        if current_class in mapeamento_cores:
-                            worksheet[f'A{start_row}'].fill = PatternFill(start_color=mapeamento_cores[current_class], fill_type='solid')
-                    
-                    # Iniciar nova classe
-                    current_class = row['Class Name']
-                    start_row = idx + 2  # +2 porque Excel começa em 1 e tem cabeçalho
-                    end_row = start_row
-                elif row['Class Name'] == current_class:
-                    end_row = idx + 2
-                else:
-                    end_row = idx + 2
-            
-            # Mesclar última classe
-            if current_class is not None and end_row > start_row:
-                worksheet.merge_cells(f'A{start_row}:A{end_row}')
-                # Centralizar verticalmente e horizontalmente
-                worksheet[f'A{start_row}'].alignment = Alignment(horizontal='center', vertical='center')
-                # Aplicar cor da turma
-                if current_class in mapeamento_cores:
-                    worksheet[f'A{start_row}'].fill = PatternFill(start_color=mapeamento_cores[current_class], fill_type='solid')
-            
-            # Definir borda preta
-            black_border = Border(
-                left=Side(style='thin', color='000000'),
-                right=Side(style='thin', color='000000'),
-                top=Side(style='thin', color='000000'),
-                bottom=Side(style='thin', color='000000')
-            )
-            
-            # Centralizar todas as células de dados e aplicar formatação condicional
-            acc_total_col = None
-            name_col = None
-            acc_personalizada_col = None
-            for col_idx, col_name in enumerate(df_export.columns, 1):
-                if col_name == 'ACC Total':
-                    acc_total_col = col_idx
-                elif col_name == 'Name':
-                    name_col = col_idx
-                elif col_name.startswith('ACC Total por') and col_name.endswith('%'):
-                    acc_personalizada_col = col_idx
-            
-            # Criar mapeamento de linha para turma
-            linha_para_turma = {}
-            current_class = None
-            for idx, row in df_export.iterrows():
-                if row['Class Name'] != current_class and row['Class Name'] != '':
-                    current_class = row['Class Name']
-                linha_para_turma[idx + 2] = current_class  # +2 porque Excel começa em 1 e tem cabeçalho
-            
-            for row in range(2, len(df_export) + 2):  # Começar da linha 2 (após cabeçalho)
-                # Obter a turma da linha atual
-                turma_da_linha = linha_para_turma.get(row, '')
-                cor_da_turma = mapeamento_cores.get(turma_da_linha, 'FFFFFF')  # Branco como padrão
-                
-                for col in range(1, len(df_export.columns) + 1):  # Todas as colunas
-                    cell = worksheet.cell(row=row, column=col)
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                    
-                    # Aplicar cor da turma em todas as células da linha (exceto colunas especiais)
-                    if col != acc_total_col and col != acc_personalizada_col:
-                        cell.fill = PatternFill(start_color=cor_da_turma, fill_type='solid')
-                        cell.border = black_border
-                    
-                    
-                    # Aplicar formatação condicional para ACC Total
-                    if col == acc_total_col and cell.value is not None:
-                        try:
-                            acc_value = float(cell.value)
-                            if acc_value < 60:
-                                cell.fill = PatternFill(start_color='d46161', fill_type='solid')
-                                cell.border = black_border
-                            if acc_value >= 60:
-                                cell.fill = PatternFill(start_color='73c56c', fill_type='solid')
-                                cell.border = black_border
-                        except (ValueError, TypeError):
-                            pass  # Ignorar se não conseguir converter para float
-                    
-                    # Aplicar formatação condicional para ACC Total por % baseada no novo input
-                    if col == acc_personalizada_col and cell.value is not None and novo_input > 0:
-                        try:
-                            acc_personalizada_value = float(cell.value)
-                            if acc_personalizada_value >= novo_input:
-                                cell.fill = PatternFill(start_color='73c56c', fill_type='solid')
-                                cell.border = black_border
-                            else:
-                                cell.fill = PatternFill(start_color='d46161', fill_type='solid')
-                                cell.border = black_border
-                        except (ValueError, TypeError):
-                            pass  # Ignorar se não conseguir converter para float
-                    
-
-            # Ajustar largura das colunas
-            worksheet.column_dimensions['A'].width = 90
-            worksheet.column_dimensions['B'].width = 50
-            worksheet.column_dimensions['C'].width = 15
-            worksheet.column_dimensions['D'].width = 40
-            worksheet.column_dimensions['E'].width = 40 
-            worksheet.column_dimensions['F'].width = 40
-            worksheet.column_dimensions['G'].width = 40
-            worksheet.column_dimensions['H'].width = 40
-            worksheet.column_dimensions['I'].width = 40
-            worksheet.column_dimensions['J'].width = 40
-            worksheet.column_dimensions['K'].width = 40
-            worksheet.column_dimensions['L'].width = 40
-            worksheet.column_dimensions['M'].width = 40
-            worksheet.column_dimensions['N'].width = 40
-            worksheet.column_dimensions['O'].width = 40
-            worksheet.column_dimensions['P'].width = 40
-            worksheet.column_dimensions['Q'].width = 40
-            worksheet.column_dimensions['R'].width = 40
-            worksheet.column_dimensions['S'].width = 40
-
-        return output.getvalue()
-    
-    excel_data = to_excel_with_merged_cells(dfFinal)
-    st.download_button(
-        label="📥 Baixar Planilha Completa (XLSX)",
-        data=excel_data,
-        file_name="dados_consolidados.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    # Planilha com células mescladas, gerada em segundo plano. Se a tabela ou a média
+    # mudarem antes de terminar, a geração anterior é cancelada.
+    tarefa = tarefa_atual(
+        st.session_state,
+        "tarefa_exportacao_consolidada",
+        (assinatura(dfFinal), novo_input),
+        obter_executor_exportacao(),
+        diagnostico.instrumentar(
+            "exportacao_consolidada",
+            partial(exportar_consolidado, dfFinal, novo_input),
+            linhas=len(dfFinal),
+            celulas=dfFinal.size,
+        ),
     )
+    area_download = st.container()
     
     # Separar por turma
     st.write("---")
     st.write("📚 Visualização por Turma:")
     
-    # Obter lista única de turmas
-    turmas = dfFinal['Class Name'].unique()
+    # As planilhas só são geradas quando o botão é clicado
+    st.download_button(
+        label="📦 Baixar Todas as Turmas (ZIP)",
+        data=diagnostico.instrumentar(
+            "exportacao_zip",
+            partial(exportar_turmas_zip, dfFinal, novo_input),
+            linhas=len(dfFinal),
+            celulas=dfFinal.size,
+        ),
+        file_name="turmas.zip",
+        mime="application/zip",
+        key="download_todas_turmas"
+    )
     
-    for turma in turmas:
-        st.write(f"### Turma: {turma}")
-        df_turma = dfFinal[dfFinal['Class Name'] == turma].copy()
-        df_turma_display = df_turma.drop('Class Name', axis=1)  # Remove a coluna Class Name pois já está no título
-        st.dataframe(df_turma_display)
-        
-        # Botão de download para a turma específica
-        def to_excel_turma(df, nome_turma):
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Criar uma cópia do dataframe para manipulação
-                df_export = df.copy()
-                
-                # Adicionar coluna vazia para mesclar
-                df_export.insert(0, 'Class_Name_Merge', '')
-                
-                # Preencher apenas a primeira linha com o nome da turma
-                df_export.at[0, 'Class_Name_Merge'] = nome_turma
-                
-                # Remover a coluna original Class Name
-                df_export = df_export.drop('Class Name', axis=1)
-                
-                # Renomear a coluna mesclada
-                df_export = df_export.rename(columns={'Class_Name_Merge': 'Class Name'})
-                
-                # Escrever no Excel
-                df_export.to_excel(writer, index=False, sheet_name=nome_turma[:31])  # Limite de 31 caracteres para nome da aba
-                
-                # Obter a planilha para mesclar células
-                worksheet = writer.sheets[nome_turma[:31]]
-                
-                # Formatar cabeçalho com cor azul escuro
-                for col in range(1, len(df_export.columns) + 1):
-                    header_cell = worksheet.cell(row=1, column=col)
-                    header_cell.fill = PatternFill(start_color='405ddb', fill_type='solid')
-                    header_cell.alignment = Alignment(horizontal='center', vertical='center')
-                    header_cell.border = Border(
-                        left=Side(style='thin', color='000000'),
-                        right=Side(style='thin', color='000000'),
-                        top=Side(style='thin', color='000000'),
-                        bottom=Side(style='thin', color='000000')
-                    )
-                
-                # Lista de cores para as turmas (mesma lista da função principal)
-                cores_turmas = [
-                    'FFE6E6',  # Rosa claro
-                    'E6F3FF',  # Azul claro
-                    'E6FFE6',  # Verde claro
-                    'FFF0E6',  # Laranja claro
-                    'F0E6FF',  # Roxo claro
-                    'FFFFE6',  # Amarelo claro
-                    'E6FFFF',  # Ciano claro
-                    'FFE6F0',  # Rosa pálido
-                    'F0FFE6',  # Verde pálido
-                    'E6E6FF'   # Azul pálido
-                ]
-                
-                # Obter todas as turmas para mapear cores
-                todas_turmas = dfFinal['Class Name'].unique()
-                mapeamento_cores = {turma: cores_turmas[i % len(cores_turmas)] for i, turma in enumerate(todas_turmas)}
-                
-                # Mesclar todas as células da coluna Class Name (já que é só uma turma)
-                if len(df_export) > 1:
-                    worksheet.merge_cells(f'A2:A{len(df_export) + 1}')
-                    # Centralizar verticalmente e horizontalmente
-                    worksheet['A2'].alignment = Alignment(horizontal='center', vertical='center')
-                    # Aplicar cor da turma
-                    if nome_turma in mapeamento_cores:
-                        worksheet['A2'].fill = PatternFill(start_color=mapeamento_cores[nome_turma], fill_type='solid')
-                
-                # Definir borda preta
-                black_border = Border(
-                    left=Side(style='thin', color='000000'),
-                    right=Side(style='thin', color='000000'),
-                    top=Side(style='thin', color='000000'),
-                    bottom=Side(style='thin', color='000000')
-                )
-                
-                # Centralizar todas as células de dados e aplicar formatação condicional
-                acc_total_col = None
-                name_col = None
-                acc_personalizada_col = None
-                for col_idx, col_name in enumerate(df_export.columns, 1):
-                    if col_name == 'ACC Total':
-                        acc_total_col = col_idx
-                    elif col_name == 'Name':
-                        name_col = col_idx
-                    elif col_name.startswith('ACC Total por') and col_name.endswith('%'):
-                        acc_personalizada_col = col_idx
-                
-                # Obter a cor da turma atual
-                cor_da_turma = mapeamento_cores.get(nome_turma, 'FFFFFF')  # Branco como padrão
-                
-                for row in range(2, len(df_export) + 2):  # Começar da linha 2 (após cabeçalho)
-                    for col in range(1, len(df_export.columns) + 1):  # Todas as colunas
-                        cell = worksheet.cell(row=row, column=col)
-                        cell.alignment = Alignment(horizontal='center', vertical='center')
-                        
-                        # Aplicar cor da turma em todas as células da linha (exceto colunas especiais)
-                        if col != acc_total_col and col != acc_personalizada_col:
-                            cell.fill = PatternFill(start_color=cor_da_turma, fill_type='solid')
-                            cell.border = black_border
-                        
-                        
-                        # Aplicar formatação condicional para ACC Total
-                        if col == acc_total_col and cell.value is not None:
-                            try:
-                                acc_value = float(cell.value)
-                                if acc_value < 60:
-                                    cell.fill = PatternFill(start_color='d46161', fill_type='solid')
-                                    cell.border = black_border
-                                if acc_value >= 60:
-                                    cell.fill = PatternFill(start_color='73c56c', fill_type='solid')
-                                    cell.border = black_border
-                            except (ValueError, TypeError):
-                                pass  # Ignorar se não conseguir converter para float
-                        
-                        # Aplicar formatação condicional para ACC Total por % baseada no novo input
-                        if col == acc_personalizada_col and cell.value is not None and novo_input > 0:
-                            try:
-                                acc_personalizada_value = float(cell.value)
-                                if acc_personalizada_value >= novo_input:
-                                    cell.fill = PatternFill(start_color='73c56c', fill_type='solid')
-                                    cell.border = black_border
-                                else:
-                                    cell.fill = PatternFill(start_color='d46161', fill_type='solid')
-                                    cell.border = black_border
-                            except (ValueError, TypeError):
-                                pass  # Ignorar se não conseguir converter para float
-                        
-                
-                # Ajustar largura das colunas
-                worksheet.column_dimensions['A'].width = 90
-                worksheet.column_dimensions['B'].width = 50
-                worksheet.column_dimensions['C'].width = 15
-                worksheet.column_dimensions['D'].width = 40
-                worksheet.column_dimensions['E'].width = 40 
-                worksheet.column_dimensions['F'].width = 40
-                worksheet.column_dimensions['G'].width = 40
-                worksheet.column_dimensions['H'].width = 40
-                worksheet.column_dimensions['I'].width = 40
-                worksheet.column_dimensions['J'].width = 40
-                worksheet.column_dimensions['K'].width = 40
-                worksheet.column_dimensions['L'].width = 40
-                worksheet.column_dimensions['M'].width = 40
-                worksheet.column_dimensions['N'].width = 40
-                worksheet.column_dimensions['O'].width = 40
-                worksheet.column_dimensions['P'].width = 40
-                worksheet.column_dimensions['Q'].width = 40
-                worksheet.column_dimensions['R'].width = 40
-                worksheet.column_dimensions['S'].width = 40
-                
-            return output.getvalue()
-        
-        # Nome do arquivo baseado na turma (removendo caracteres especiais)
-        nome_arquivo = turma.replace(' ', '_').replace('-', '_').replace('º', '').replace('°', '')
-        excel_data_turma = to_excel_turma(df_turma, turma)
-        
-        st.download_button(
-            label=f"📥 Baixar {turma} (XLSX)",
-            data=excel_data_turma,
-            file_name=f"{nome_arquivo}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key=f"download_{turma}"  # Chave única para cada botão
+    visualizacao_turma(dfFinal, novo_input, diagnostico)
+
+    # Só espera a planilha depois que o resto da página já foi desenhado
+    with area_download:
+        download_consolidado(tarefa)
+
+
+if arquivos or selecionados:
+    # Estado da consolidação desta sessão: só os arquivos novos são lidos e agregados,
+    # e só as colunas dos quizzes que mudaram são refeitas
+    if "consolidacao" not in st.session_state:
+        st.session_state.consolidacao = ConsolidacaoIncremental(compacto=MODO_COMPACTO)
+    consolidacao = st.session_state.consolidacao
+
+    with diagnostico.etapa("leitura") as registro:
+        chaves, novos = agregar_em_fluxo(
+            entradas_enviadas(arquivos or []),
+            ja_agregadas=consolidacao,
+            trabalhadores=TRABALHADORES_LEITURA,
+            cache=obter_cache_quizzes(),
+            diagnostico=diagnostico,
+            armazem=armazem,
+            pool=obter_pool_leitura(),
         )
-        st.write("---")
+        registro["arquivos"] = len(novos)
+
+    # Quizzes salvos entram depois dos enviados agora (os repetidos são ignorados)
+    salvas = [chave for chave in selecionados if chave not in chaves]
+    if salvas:
+        with diagnostico.etapa("banco", arquivos=len(salvas)) as registro:
+            faltando = []
+            for chave in salvas:
+                if chave not in consolidacao:
+                    df = armazem.buscar(chave)
+                    if df is None:
+                        faltando.append(chave)
+                    else:
+                        novos[chave] = df
+            salvas = [chave for chave in salvas if chave not in faltando]
+            registro["linhas"] = sum(len(novos[c]) for c in salvas if c in novos)
+        if faltando:
+            # Ex.: apagado em outra sessão, ou descartado pelo limite do banco
+            st.warning("Quizzes que não estão mais no banco e foram ignorados: "
+                       + ", ".join(nome_base for _, nome_base in faltando))
+        chaves += salvas
+
+    if not chaves:
+        # Ex.: um ZIP vazio ou só com arquivos que não são .xlsx
+        st.warning("Nenhuma exportação .xlsx encontrada nos arquivos enviados.")
+    else:
+        # Mudar a porcentagem ou a média só refaz as colunas derivadas
+        with diagnostico.etapa("consolidacao", arquivos=len(chaves)) as registro:
+            consolidacao.atualizar(chaves, novos)
+            dfFinal = consolidacao.tabela()
+            registro["linhas"], registro["celulas"] = len(dfFinal), dfFinal.size
+
+        if dfFinal.empty:
+            st.warning("Nenhum aluno com turma encontrado nas exportações enviadas.")
+        else:
+            resultados(dfFinal, diagnostico)
+
+with painel_diagnostico:
+    tabela_diagnostico(diagnostico)
@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS quizzes (
+    hash TEXT NOT NULL,
+    nome_base TEXT NOT NULL,
+    alunos INTEGER NOT NULL,
+    importado_em TEXT NOT NULL,
+    PRIMARY KEY (hash, nome_base)
+);
+CREATE TABLE IF NOT EXISTS resultados (
+    hash TEXT NOT NULL,
+    nome_base TEXT NOT NULL,
+    class_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    acc REAL,
+    tentativas INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resultados_quiz ON resultados (hash, nome_base);
+"""
+
+
+class ArmazemQuizzes:
+    # Guarda em disco (SQLite) os quizzes já agregados, com a mesma chave do
+    # CacheQuizzes: (hash do arquivo, nome_base). Sobrevive a reinícios do app e
+    # permite consolidar quizzes de sessões e bimestres anteriores sem reler o XLSX.
+    # max_quizzes limita o tamanho do banco: os importados há mais tempo saem primeiro.
+
+    def __init__(self, caminho, max_quizzes=None):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self.max_quizzes = max_quizzes
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+        with self._lock, self._conexao:
+            self._conexao.executescript(ESQUEMA)
+
+    def __contains__(self, chave):
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT 1 FROM quizzes WHERE hash = ? AND nome_base = ?", chave
+            ).fetchone()
+        return linha is not None
+
+    def buscar(self, chave):
+        # Quiz agregado (Class Name, Name, Acc-<quiz>, Tentativa-<quiz>) ou None
+        if chave not in self:
+            return None
+        _, nome_base = chave
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT class_name, name, acc, tentativas FROM resultados"
+                " WHERE hash = ? AND nome_base = ? ORDER BY rowid",
+                self._conexao,
+                params=chave,
+                dtype={'acc': 'float64', 'tentativas': 'int64'},
+            )
+        df['class_name'] = df['class_name'].astype(str)
+        df['name'] = df['name'].astype(str)
+        return df.rename(columns={
+            'class_name': 'Class Name',
+            'name': 'Name',
+            'acc': f"Acc-{nome_base}",
+            'tentativas': f"Tentativa-{nome_base}",
+        })
+
+    def guardar(self, chave, df):
+        hash_arquivo, nome_base = chave
+        # NaN vira NULL no SQLite e volta como NaN na leitura
+        linhas = zip(
+            df['Class Name'].astype(str).tolist(),
+            df['Name'].astype(str).tolist(),
+            df[f"Acc-{nome_base}"].astype('float64').tolist(),
+            df[f"Tentativa-{nome_base}"].astype('int64').tolist(),
+        )
+        importado_em = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "DELETE FROM resultados WHERE hash = ? AND nome_base = ?", chave
+            )
+            self._conexao.executemany(
+                "INSERT INTO resultados (hash, nome_base, class_name, name, acc, tentativas)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                ((hash_arquivo, nome_base, turma, nome, acc, tentativas)
+                 for turma, nome, acc, tentativas in linhas),
+            )
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO quizzes (hash, nome_base, alunos, importado_em) VALUES (?, ?, ?, ?)",
+                (hash_arquivo, nome_base, len(df), importado_em),
+            )
+            if self.max_quizzes is not None:
+                antigos = self._conexao.execute(
+                    "SELECT hash, nome_base FROM quizzes ORDER BY importado_em DESC, rowid DESC"
+                    " LIMIT -1 OFFSET ?", (self.max_quizzes,)
+                ).fetchall()
+                for antigo in antigos:
+                    self._remover(antigo)
+
+    def _remover(self, chave):
+        self._conexao.execute("DELETE FROM resultados WHERE hash = ? AND nome_base = ?", chave)
+        self._conexao.execute("DELETE FROM quizzes WHERE hash = ? AND nome_base = ?", chave)
+
+    def remover(self, chave):
+        with self._lock, self._conexao:
+            self._remover(chave)
+
+    def listar(self):
+        # Quizzes salvos, do mais recente para o mais antigo
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT hash, nome_base, alunos, importado_em FROM quizzes ORDER BY importado_em DESC, rowid DESC",
+                self._conexao,
+            )
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
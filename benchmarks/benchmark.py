@@ -0,0 +1,109 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.gerador import gerar_exportacoes
+from consolidacao import aplicar_porcentagem, consolidar
+from exportacao import exportar_consolidado, exportar_turma
+from leitura import MOTOR_PADRAO, agregar_participantes, ler_participant_data, nome_base_do_arquivo
+
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def executar_rodada(exportacoes, porcentagem=30.0, media=20, motor=None):
+    # Tempo de cada etapa do pipeline, na mesma ordem em que o app executa
+    tempos = {}
+
+    tempos['leitura'], lidos = _cronometrar(lambda: [
+        (nome_base_do_arquivo(nome), ler_participant_data(conteudo, motor)) for nome, conteudo in exportacoes
+    ])
+    tempos['agregacao'], dataframes = _cronometrar(lambda: [
+        agregar_participantes(df, nome_base) for nome_base, df in lidos
+    ])
+    tempos['consolidacao'], dfFinal = _cronometrar(
+        lambda: aplicar_porcentagem(consolidar(dataframes), porcentagem)
+    )
+    tempos['exportacao_consolidada'], _ = _cronometrar(lambda: exportar_consolidado(dfFinal, media))
+
+    turmas = dfFinal['Class Name'].unique()
+    tempos['exportacao_turmas'], _ = _cronometrar(lambda: [
+        exportar_turma(df_turma, turma, turmas, media)
+        for turma, df_turma in dfFinal.groupby('Class Name', sort=False)
+    ])
+
+    contagens = {
+        'linhas_lidas': sum(len(df) for _, df in lidos),
+        'linhas_consolidadas': len(dfFinal),
+        'colunas_consolidadas': len(dfFinal.columns),
+        'turmas': len(turmas),
+    }
+    return tempos, contagens
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mede cada etapa da calculadora com exportações sintéticas e imprime o resultado em JSON."
+    )
+    parser.add_argument('--turmas', type=int, default=10)
+    parser.add_argument('--alunos', type=int, default=30, help="alunos por turma")
+    parser.add_argument('--quizzes', type=int, default=10)
+    parser.add_argument('--tentativas', type=int, default=3, help="máximo de tentativas por aluno")
+    parser.add_argument('--ausentes', type=float, default=0.1, help="fração de alunos que não faz cada quiz")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--motor', default=None, help=f"motor de leitura (padrão: {MOTOR_PADRAO})")
+    parser.add_argument('--saida', help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    exportacoes = gerar_exportacoes(args.turmas, args.alunos, args.quizzes, args.tentativas, args.ausentes)
+
+    rodadas = []
+    for _ in range(args.repeticoes):
+        tempos, contagens = executar_rodada(exportacoes, motor=args.motor)
+        rodadas.append(tempos)
+
+    resultado = {
+        'parametros': {
+            'turmas': args.turmas,
+            'alunos_por_turma': args.alunos,
+            'quizzes': args.quizzes,
+            'tentativas': args.tentativas,
+            'ausentes': args.ausentes,
+            'repeticoes': args.repeticoes,
+            'motor': args.motor or MOTOR_PADRAO,
+        },
+        'ambiente': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+        },
+        'contagens': contagens,
+        # Mediana e mínimo de cada etapa, em segundos
+        'etapas': {
+            etapa: {
+                'mediana': round(statistics.median(r[etapa] for r in rodadas), 6),
+                'minimo': round(min(r[etapa] for r in rodadas), 6),
+            }
+            for etapa in rodadas[0]
+        },
+    }
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto + '\n')
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
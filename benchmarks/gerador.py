@@ -0,0 +1,89 @@
+import argparse
+import io
+import os
+import random
+
+import xlsxwriter
+
+from leitura import ABA_PARTICIPANTES
+
+COLUNAS_EXPORTACAO = [
+    'First Name', 'Last Name', 'Class Name', 'Attempt #', 'Score', 'Accuracy',
+    'Correct', 'Incorrect', 'Unattempted', 'Started At', 'Total Time Taken',
+]
+NOMES = ['Ana', 'Bruno', 'Carla', 'Davi', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela',
+         'João', 'Larissa', 'Miguel', 'Nicole', 'Otávio', 'Pedro', 'Rafaela', 'Samuel', 'Valentina']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Rodrigues',
+              'Almeida', 'Nascimento', 'Ferreira', 'Carvalho', 'Gomes', 'Martins', 'Rocha']
+
+
+def gerar_alunos(turmas, alunos_por_turma, semente=0):
+    # Lista de (turma, primeiro nome, sobrenome); o sufixo numérico evita nomes repetidos
+    aleatorio = random.Random(semente)
+    alunos = []
+    for t in range(turmas):
+        turma = f"{t % 4 + 6}º Ano - Turma {t // 4 + 1}"
+        for a in range(alunos_por_turma):
+            alunos.append((turma, aleatorio.choice(NOMES), f"{aleatorio.choice(SOBRENOMES)} {t}.{a}"))
+    return alunos
+
+
+def gerar_exportacao(alunos, tentativas=3, ausentes=0.1, questoes=10, semente=0):
+    # Bytes de uma exportação do Wayground com a aba 'Participant Data'. Cada aluno
+    # faz de 1 a `tentativas` tentativas; uma fração `ausentes` não faz o quiz.
+    aleatorio = random.Random(semente)
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    workbook.add_worksheet('Overview').write_row(0, 0, ['Quiz', 'Players'])
+    worksheet = workbook.add_worksheet(ABA_PARTICIPANTES)
+    worksheet.write_row(0, 0, COLUNAS_EXPORTACAO)
+
+    linha = 1
+    for turma, primeiro_nome, sobrenome in alunos:
+        if aleatorio.random() < ausentes:
+            continue
+        for tentativa in range(1, aleatorio.randint(1, tentativas) + 1):
+            corretas = aleatorio.randint(0, questoes)
+            erradas = aleatorio.randint(0, questoes - corretas)
+            worksheet.write_row(linha, 0, [
+                primeiro_nome, sobrenome, turma, tentativa, corretas * 100,
+                f"{round(corretas / questoes * 100)}%", corretas, erradas,
+                questoes - corretas - erradas, f"2024-05-{aleatorio.randint(1, 28):02d} 10:00",
+                f"{aleatorio.randint(60, 1800)}s",
+            ])
+            linha += 1
+
+    workbook.close()
+    return output.getvalue()
+
+
+def gerar_exportacoes(turmas=10, alunos_por_turma=30, quizzes=10, tentativas=3, ausentes=0.1, semente=0):
+    # Lista de (nome do arquivo, bytes), com nomes no formato "<quiz>-<resto>.xlsx"
+    alunos = gerar_alunos(turmas, alunos_por_turma, semente)
+    return [
+        (f"Quiz {q + 1:02d}-participant-data.xlsx",
+         gerar_exportacao(alunos, tentativas, ausentes, semente=semente + q + 1))
+        for q in range(quizzes)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera exportações sintéticas do Wayground.")
+    parser.add_argument('pasta', help="pasta onde os .xlsx serão gravados")
+    parser.add_argument('--turmas', type=int, default=10)
+    parser.add_argument('--alunos', type=int, default=30, help="alunos por turma")
+    parser.add_argument('--quizzes', type=int, default=10)
+    parser.add_argument('--tentativas', type=int, default=3, help="máximo de tentativas por aluno")
+    parser.add_argument('--ausentes', type=float, default=0.1, help="fração de alunos que não faz cada quiz")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.pasta, exist_ok=True)
+    for nome, conteudo in gerar_exportacoes(args.turmas, args.alunos, args.quizzes,
+                                            args.tentativas, args.ausentes, args.semente):
+        with open(os.path.join(args.pasta, nome), 'wb') as arquivo:
+            arquivo.write(conteudo)
+
+
+if __name__ == '__main__':
+    main()
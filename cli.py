@@ -0,0 +1,96 @@
+import argparse
+import glob
+import os
+import sys
+
+from consolidacao import aplicar_porcentagem, consolidar
+from exportacao import salvar_consolidado, salvar_turmas
+from leitura import agregar_caminhos, chave_da_origem, eh_exportacao, eh_zip, membros_zip
+
+
+def listar_arquivos(entradas):
+    # Cada entrada pode ser uma pasta, um arquivo ou um padrão glob ("exports/*.xlsx").
+    # Cada exportação dentro de um .zip vira um (caminho do ZIP, membro), lido só na hora.
+    # A mesma exportação vista duas vezes (ex.: solta e dentro de um ZIP) entra uma vez só.
+    caminhos = []
+    vistos = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            encontrados = glob.glob(os.path.join(entrada, '*.xlsx')) + glob.glob(os.path.join(entrada, '*.zip'))
+        else:
+            encontrados = glob.glob(entrada)
+        for caminho in sorted(encontrados):
+            if eh_zip(caminho):
+                origens = [(caminho, membro) for membro in membros_zip(caminho)]
+            elif eh_exportacao(caminho):
+                origens = [caminho]
+            else:
+                continue
+            for origem in origens:
+                chave = chave_da_origem(origem)
+                if chave not in vistos:
+                    vistos.add(chave)
+                    caminhos.append(origem)
+    return caminhos
+
+
+def nome_exibido(caminho):
+    if isinstance(caminho, tuple):
+        caminho_zip, membro = caminho
+        return f"{os.path.basename(caminho_zip)}/{membro}"
+    return os.path.basename(caminho)
+
+
+def progresso(mensagem):
+    print(mensagem, file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Consolida exportações do Wayground (.xlsx) em uma planilha geral e uma por turma."
+    )
+    parser.add_argument('entradas', nargs='+', help="pastas, arquivos (.xlsx ou .zip) ou padrões glob com as exportações")
+    parser.add_argument('-o', '--saida', default='saida', help="pasta de saída (padrão: ./saida)")
+    parser.add_argument('-p', '--porcentagem', type=float, default=0.0,
+                        help="cria a coluna 'ACC Total por X%%' (ex: 30 para 30%%)")
+    parser.add_argument('-m', '--media', type=int, default=0,
+                        help="média da coluna 'ACC Total por X%%': acima fica verde, abaixo vermelho")
+    parser.add_argument('-j', '--trabalhadores', type=int, default=0,
+                        help="processos de leitura (1 = sequencial, 0 = todos os núcleos)")
+    parser.add_argument('--compacto', action='store_true',
+                        help="usa tipos menores na tabela consolidada (menos memória, mesma saída)")
+    parser.add_argument('--sem-turmas', action='store_true', help="não gera as planilhas por turma")
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.porcentagem <= 100:
+        parser.error("--porcentagem deve estar entre 0 e 100")
+
+    caminhos = listar_arquivos(args.entradas)
+    if not caminhos:
+        parser.error("nenhum arquivo .xlsx encontrado")
+
+    dataframes = []
+    for i, (caminho, df) in enumerate(agregar_caminhos(caminhos, args.trabalhadores), 1):
+        dataframes.append(df)
+        progresso(f"[{i}/{len(caminhos)}] {nome_exibido(caminho)}")
+
+    dfFinal = aplicar_porcentagem(consolidar(dataframes, args.compacto), args.porcentagem)
+    del dataframes
+
+    os.makedirs(args.saida, exist_ok=True)
+    caminho_consolidado = os.path.join(args.saida, 'dados_consolidados.xlsx')
+    salvar_consolidado(dfFinal, caminho_consolidado, args.media)
+    progresso(f"Planilha completa: {caminho_consolidado} ({len(dfFinal)} alunos)")
+
+    if not args.sem_turmas:
+        pasta_turmas = os.path.join(args.saida, 'turmas')
+        os.makedirs(pasta_turmas, exist_ok=True)
+        total_turmas = dfFinal['Class Name'].nunique()
+        for i, turma in enumerate(salvar_turmas(dfFinal, pasta_turmas, args.media), 1):
+            progresso(f"[{i}/{total_turmas}] Turma: {turma}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
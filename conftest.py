@@ -0,0 +1 @@
+# Deixa os módulos da raiz importáveis nos testes (consolidacao, leitura, ...)
@@ -0,0 +1,181 @@
+import pandas as pd
+
+CHAVES = ['Class Name', 'Name']
+
+
+def quiz_da_coluna(coluna):
+    # "Acc-Quiz 1" -> "Quiz 1"
+    return coluna.split("-", 1)[1]
+
+
+def _colunas_do_quiz(df):
+    col_acc = next(c for c in df.columns if c.startswith('Acc-'))
+    col_tentativa = next(c for c in df.columns if c.startswith('Tentativa-'))
+    return quiz_da_coluna(col_acc), col_acc, col_tentativa
+
+
+def _juntar_repetidos(df, chaves, col_acc, col_tentativa):
+    # Arquivos com o mesmo nome de quiz são somados como se fossem um só:
+    # maior acurácia e total de tentativas de cada aluno
+    return (
+        df.groupby(chaves, sort=False)
+            .agg(**{col_acc: (col_acc, 'max'), col_tentativa: (col_tentativa, 'sum')})
+        )
+
+
+def _float32_se_exato(coluna):
+    # float32 só quando nenhum valor muda (ex.: acurácias inteiras), para a planilha sair igual
+    compacta = coluna.astype('float32')
+    if (compacta.astype('float64') == coluna).all():
+        return compacta
+    return coluna
+
+
+def _compactar(dfFinal, quizzes):
+    # Turma e aluno viram categorias (cada texto guardado uma vez só), tentativas viram
+    # inteiros pequenos e acurácias float32. Os valores continuam os mesmos.
+    for chave in CHAVES:
+        dfFinal[chave] = dfFinal[chave].astype('category')
+    for quiz in quizzes:
+        dfFinal[f"Acc-{quiz}"] = _float32_se_exato(dfFinal[f"Acc-{quiz}"])
+        dfFinal[f"Tentativa-{quiz}"] = pd.to_numeric(
+            dfFinal[f"Tentativa-{quiz}"].astype('int64'), downcast='unsigned'
+        )
+    return dfFinal
+
+
+def _finalizar(largo, quizzes, compacto=False):
+    # largo: índice (Class Name, Name) e colunas Acc-/Tentativa- ainda com NaN
+    colunas = {}
+    for quiz in quizzes:
+        colunas[f"Acc-{quiz}"] = largo[f"Acc-{quiz}"]
+        tentativas = largo[f"Tentativa-{quiz}"]
+        # Como no merge antigo: a contagem só vira float se faltar algum aluno no quiz
+        if not tentativas.isna().any():
+            tentativas = tentativas.astype('int64')
+        colunas[f"Tentativa-{quiz}"] = tentativas
+
+    dfFinal = pd.DataFrame(colunas, index=largo.index).reset_index()
+    dfFinal.fillna(0, inplace=True)
+
+    # Calcular ACC Total (média das médias de acurácia de cada arquivo)
+    colunas_acc = [col for col in dfFinal.columns if col.startswith('Acc-')]
+    dfFinal['ACC Total'] = dfFinal[colunas_acc].mean(axis=1, skipna=True).round(2)
+
+    if compacto:
+        dfFinal = _compactar(dfFinal, quizzes)
+    return dfFinal
+
+
+def consolidar(dataframes, compacto=False):
+    # Junta os quizzes agregados (Class Name, Name, Acc-<quiz>, Tentativa-<quiz>) em uma
+    # única tabela larga. Em vez de k-1 merges sucessivos, empilha tudo em formato longo,
+    # agrupa uma vez por (turma, aluno, quiz) e faz um único pivot.
+    # compacto=True usa tipos menores na tabela final (ver _compactar).
+    quizzes = []
+    partes = []
+    for df in dataframes:
+        quiz, col_acc, col_tentativa = _colunas_do_quiz(df)
+        if quiz not in quizzes:
+            quizzes.append(quiz)
+        partes.append(pd.DataFrame({
+            'Class Name': df['Class Name'],
+            'Name': df['Name'],
+            'Quiz': quiz,
+            'Acc': df[col_acc],
+            'Tentativa': df[col_tentativa],
+        }))
+
+    longo = pd.concat(partes, ignore_index=True)
+    agregado = _juntar_repetidos(longo, CHAVES + ['Quiz'], 'Acc', 'Tentativa')
+    largo = agregado.unstack('Quiz').sort_index()
+    largo.columns = [f"{medida}-{quiz}" for medida, quiz in largo.columns]
+    # Um quiz sem nenhuma linha (ex.: todas sem Class Name) não gera colunas no unstack,
+    # mas no merge antigo continuava na tabela com NaN (depois 0)
+    largo = largo.reindex(columns=[f"{medida}-{quiz}" for quiz in quizzes for medida in ('Acc', 'Tentativa')])
+    return _finalizar(largo, quizzes, compacto)
+
+
+class ConsolidacaoIncremental:
+    # Mantém os quizzes agregados e a tabela larga entre reruns. A cada mudança na lista
+    # de arquivos só o que mudou é refeito: um quiz novo entra como um par de colunas
+    # (join) e um quiz removido só tem suas colunas apagadas.
+
+    def __init__(self, compacto=False):
+        self.compacto = compacto
+        self._arquivos = {}  # chave do arquivo -> quiz agregado
+        self._quizzes = {}  # quiz -> chaves dos arquivos que formam o quiz
+        self._largo = None
+        self._tabela = None
+
+    def __contains__(self, chave):
+        return chave in self._arquivos
+
+    def _colunas_quiz(self, quiz, chaves):
+        frames = [self._arquivos[chave] for chave in chaves]
+        col_acc, col_tentativa = f"Acc-{quiz}", f"Tentativa-{quiz}"
+        if len(frames) == 1:
+            return frames[0].set_index(CHAVES)[[col_acc, col_tentativa]]
+        return _juntar_repetidos(pd.concat(frames, ignore_index=True), CHAVES, col_acc, col_tentativa)
+
+    def atualizar(self, chaves, novos=None):
+        # chaves: chave de cada arquivo na ordem do upload.
+        # novos: quizzes agregados dos arquivos que ainda não estão no estado.
+        # O mesmo arquivo enviado duas vezes (ex.: solto e dentro de um ZIP) conta uma vez só.
+        chaves = list(dict.fromkeys(chaves))
+        self._arquivos.update(novos or {})
+
+        quizzes = {}
+        for chave in chaves:
+            quiz, _, _ = _colunas_do_quiz(self._arquivos[chave])
+            quizzes.setdefault(quiz, []).append(chave)
+        quizzes = {quiz: tuple(chaves_quiz) for quiz, chaves_quiz in quizzes.items()}
+
+        removidos = [q for q in self._quizzes if quizzes.get(q) != self._quizzes[q]]
+        adicionados = [q for q in quizzes if self._quizzes.get(q) != quizzes[q]]
+        ordem_mudou = list(quizzes) != list(self._quizzes)
+        if not removidos and not adicionados and not ordem_mudou:
+            return
+
+        largo = self._largo
+        if removidos and largo is not None:
+            largo = largo.drop(columns=[f"{medida}-{q}" for q in removidos for medida in ('Acc', 'Tentativa')])
+            # Alunos que só apareciam nos quizzes removidos saem da tabela
+            colunas_tentativa = [c for c in largo.columns if c.startswith('Tentativa-')]
+            largo = largo[largo[colunas_tentativa].notna().any(axis=1)]
+        for quiz in adicionados:
+            colunas = self._colunas_quiz(quiz, quizzes[quiz])
+            largo = colunas if largo is None else largo.join(colunas, how='outer')
+        if adicionados:
+            largo = largo.sort_index()
+
+        # Colunas sempre na ordem do upload
+        self._largo = largo[[f"{medida}-{q}" for q in quizzes for medida in ('Acc', 'Tentativa')]]
+        self._quizzes = quizzes
+        self._arquivos = {chave: self._arquivos[chave] for chave in chaves}
+        self._tabela = None
+
+    def tabela(self):
+        # dfFinal pronto (fillna + ACC Total); só é refeito quando os arquivos mudam
+        if self._tabela is None:
+            self._tabela = _finalizar(self._largo, list(self._quizzes), self.compacto)
+        return self._tabela
+
+
+def coluna_porcentagem(porcentagem):
+    return f'ACC Total por {porcentagem}%'
+
+
+def aplicar_porcentagem(dfFinal, porcentagem=0):
+    # Adicionar coluna personalizada se porcentagem for informada
+    if porcentagem > 0:
+        dfFinal = dfFinal.assign(**{
+            coluna_porcentagem(porcentagem): (dfFinal['ACC Total'] * (porcentagem / 100)).round(2)
+        })
+
+    # Reordenar colunas para colocar ACC Total após Name
+    colunas_ordenadas = CHAVES + ['ACC Total']
+    if porcentagem > 0:
+        colunas_ordenadas.append(coluna_porcentagem(porcentagem))
+    colunas_restantes = [col for col in dfFinal.columns if col not in colunas_ordenadas]
+    return dfFinal[colunas_ordenadas + colunas_restantes]
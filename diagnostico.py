@@ -0,0 +1,144 @@
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger("wayground.diagnostico")
+
+# O tracemalloc é global ao processo: fica ligado enquanto houver alguma medição
+# em andamento (em qualquer thread) e cada thread guarda a própria pilha de etapas.
+# O pico também é um só: reset_peak() de uma thread zera o pico que outra thread
+# estava medindo. Por isso medições que se sobrepõem entre threads (ex.: a exportação
+# em segundo plano) saem marcadas como aproximadas.
+_lock = threading.Lock()
+_quadros_ativos = []  # medições em andamento, de todas as threads
+_local = threading.local()
+
+
+def configurar_log(nivel=logging.INFO):
+    # Uma linha JSON por etapa no stderr, para agregar entre sessões no servidor
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(nivel)
+        logger.propagate = False
+
+
+def _iniciar_memoria():
+    quadro = {'thread': threading.get_ident(), 'aproximado': False}
+    with _lock:
+        if not _quadros_ativos:
+            tracemalloc.start()
+        outras_threads = [q for q in _quadros_ativos if q['thread'] != quadro['thread']]
+        if outras_threads:
+            quadro['aproximado'] = True
+            for outro in outras_threads:
+                outro['aproximado'] = True
+        _quadros_ativos.append(quadro)
+    pilha = _local.__dict__.setdefault('pilha', [])
+    atual, pico = tracemalloc.get_traced_memory()
+    # O pico vai ser zerado: a etapa de fora guarda o que viu até aqui
+    if pilha:
+        pilha[-1]['pico'] = max(pilha[-1]['pico'], pico)
+    tracemalloc.reset_peak()
+    quadro['base'] = quadro['pico'] = atual
+    pilha.append(quadro)
+    return quadro
+
+
+def _finalizar_memoria(quadro, metricas):
+    _, pico = tracemalloc.get_traced_memory()
+    pico = max(quadro['pico'], pico)
+    pilha = _local.pilha
+    pilha.pop()
+    if pilha:
+        pilha[-1]['pico'] = max(pilha[-1]['pico'], pico)
+    with _lock:
+        _quadros_ativos[:] = [q for q in _quadros_ativos if q is not quadro]
+        if not _quadros_ativos:
+            tracemalloc.stop()
+    metricas['pico_memoria_mb'] = round((pico - quadro['base']) / 2**20, 3)
+    if quadro['aproximado']:
+        metricas['memoria_aproximada'] = True
+
+
+def medir(funcao, *args, medir_memoria=False):
+    # Executa funcao(*args) e devolve (resultado, métricas). Pode rodar em outro
+    # processo, por isso as métricas voltam junto com o resultado.
+    quadro = _iniciar_memoria() if medir_memoria else None
+    inicio = time.perf_counter()
+    try:
+        resultado = funcao(*args)
+    finally:
+        metricas = {'segundos': round(time.perf_counter() - inicio, 4)}
+        if quadro is not None:
+            _finalizar_memoria(quadro, metricas)
+    return resultado, metricas
+
+
+class Diagnostico:
+    # Registra tempo, pico de memória (opcional, via tracemalloc) e contagens de cada
+    # etapa do pipeline e de cada arquivo. Cada registro também vira uma linha de log.
+    # Pode durar a sessão inteira (ex.: em st.session_state): max_registros limita
+    # quantos ficam guardados e `execucao` separa os registros de cada rerun.
+
+    def __init__(self, medir_memoria=False, sessao=None, max_registros=None):
+        self.medir_memoria = medir_memoria
+        self.sessao = sessao or uuid.uuid4().hex[:8]
+        self.registros = deque(maxlen=max_registros)
+        self.execucao = 0
+        self._lock = threading.Lock()  # a exportação em segundo plano registra de outra thread
+
+    def nova_execucao(self):
+        self.execucao += 1
+
+    def registrar(self, etapa, **dados):
+        registro = {'execucao': self.execucao, 'etapa': etapa, **dados}
+        with self._lock:
+            self.registros.append(registro)
+        logger.info(json.dumps({'sessao': self.sessao, **registro}, ensure_ascii=False, default=str))
+        return registro
+
+    @contextmanager
+    def etapa(self, nome, **detalhes):
+        # Uso: with diagnostico.etapa('consolidacao') as r: ...; r['linhas'] = len(df)
+        dados = dict(detalhes)
+        quadro = _iniciar_memoria() if self.medir_memoria else None
+        inicio = time.perf_counter()
+        try:
+            yield dados
+        except BaseException as erro:
+            # Ex.: TarefaCancelada na exportação em segundo plano
+            dados['interrompida'] = type(erro).__name__
+            raise
+        finally:
+            dados['segundos'] = round(time.perf_counter() - inicio, 4)
+            if quadro is not None:
+                _finalizar_memoria(quadro, dados)
+            self.registrar(nome, **dados)
+
+    def instrumentar(self, nome, funcao, **detalhes):
+        # Envolve uma função chamada mais tarde (ex.: o data= de um download_button);
+        # o registro fica com a execução em que a função foi criada
+        detalhes = {'execucao': self.execucao, **detalhes}
+
+        def chamada(*args, **kwargs):
+            with self.etapa(nome, **detalhes) as dados:
+                resultado = funcao(*args, **kwargs)
+                if isinstance(resultado, bytes):
+                    dados['bytes'] = len(resultado)
+                return resultado
+        return chamada
+
+    def tabela(self):
+        with self._lock:
+            registros = list(self.registros)
+        return pd.DataFrame(registros)
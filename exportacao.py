@@ -0,0 +1,197 @@
+import io
+import os
+import zipfile
+
+import xlsxwriter
+
+
+# Lista de cores para as turmas
+CORES_TURMAS = [
+    'FFE6E6',  # Rosa claro
+    'E6F3FF',  # Azul claro
+    'E6FFE6',  # Verde claro
+    'FFF0E6',  # Laranja claro
+    'F0E6FF',  # Roxo claro
+    'FFFFE6',  # Amarelo claro
+    'E6FFFF',  # Ciano claro
+    'FFE6F0',  # Rosa pálido
+    'F0FFE6',  # Verde pálido
+    'E6E6FF'   # Azul pálido
+]
+COR_CABECALHO = '405ddb'
+COR_ABAIXO = 'd46161'
+COR_ACIMA = '73c56c'
+MEDIA_ACC_TOTAL = 60
+
+# A cada quantas linhas escritas o progresso é informado
+PASSO_PROGRESSO = 500
+
+# Largura das colunas A, B e C; as seguintes até a S ficam com 40
+LARGURAS_COLUNAS = [90, 50, 15] + [40] * 16
+
+
+def mapear_cores(turmas):
+    return {turma: CORES_TURMAS[i % len(CORES_TURMAS)] for i, turma in enumerate(turmas)}
+
+
+def _criar_formatos(workbook, mapeamento_cores):
+    # Cada formato é criado uma única vez e reaproveitado em todas as células
+    base = {'align': 'center', 'valign': 'vcenter'}
+    borda = dict(base, border=1, border_color='#000000')
+    return {
+        'cabecalho': workbook.add_format(dict(borda, bg_color=f'#{COR_CABECALHO}')),
+        'centro': workbook.add_format(base),
+        'nota': workbook.add_format(borda),
+        'branco': workbook.add_format(dict(borda, bg_color='#FFFFFF')),
+        'turmas': {turma: workbook.add_format(dict(borda, bg_color=f'#{cor}'))
+                   for turma, cor in mapeamento_cores.items()},
+        # Formatos das regras condicionais (só a cor de fundo muda)
+        'abaixo': workbook.add_format({'bg_color': f'#{COR_ABAIXO}'}),
+        'acima': workbook.add_format({'bg_color': f'#{COR_ACIMA}'}),
+    }
+
+
+def _mesclar(worksheet, primeira_linha, ultima_linha, coluna):
+    # merge_range() preenche as células de baixo na hora, o que não funciona no modo
+    # constant_memory (as linhas já gravadas não podem ser reescritas). As células de
+    # baixo são escritas em branco, com a cor da turma, conforme o laço chega nelas;
+    # aqui basta registrar a área mesclada na lista worksheet.merge, a mesma que o merge_range usa (requirements.txt fixa a
+    # versão do xlsxwriter e tests/test_exportacao.py confere o resultado).
+    worksheet.merge.append([primeira_linha, coluna, ultima_linha, coluna])
+
+
+def _regras_media(worksheet, formatos, coluna, ultima_linha, media):
+    # Regras nativas do Excel: a cor acompanha a nota mesmo se ela for editada depois
+    for criterio, formato in (('<', formatos['abaixo']), ('>=', formatos['acima'])):
+        worksheet.conditional_format(1, coluna, ultima_linha, coluna, {
+            'type': 'cell',
+            'criteria': criterio,
+            'value': media,
+            'format': formato,
+        })
+
+
+def _escrever_planilha(output, df, nome_aba, mapeamento_cores, novo_input=0, progresso=None):
+    # Escreve a planilha linha a linha com memória constante. Só as células da tabela
+    # recebem a cor da turma (os formatos são criados uma vez por planilha) e o
+    # verde/vermelho de ACC Total e ACC Total por X% fica a cargo de formatação
+    # condicional, sem nenhum teste célula a célula.
+    # progresso(fração das linhas escritas) é chamado de tempos em tempos; uma
+    # exceção lançada por ele interrompe a escrita (ex.: tarefa cancelada).
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_urls': False})
+    worksheet = workbook.add_worksheet(nome_aba)
+    formatos = _criar_formatos(workbook, mapeamento_cores)
+
+    for col, largura in enumerate(LARGURAS_COLUNAS):
+        worksheet.set_column(col, col, largura)
+
+    colunas = list(df.columns)
+    for col, nome_coluna in enumerate(colunas):
+        worksheet.write_string(0, col, nome_coluna, formatos['cabecalho'])
+
+    col_turma = colunas.index('Class Name')
+    col_acc_total = colunas.index('ACC Total') if 'ACC Total' in colunas else None
+    col_acc_personalizada = next(
+        (i for i, c in enumerate(colunas) if c.startswith('ACC Total por') and c.endswith('%')), None
+    )
+    ultima_linha = len(df)
+
+    # Formato fixo por coluna; None usa a cor da turma da linha
+    formatos_colunas = [None] * len(colunas)
+    if col_acc_total is not None:
+        formatos_colunas[col_acc_total] = formatos['nota']
+        if ultima_linha:
+            _regras_media(worksheet, formatos, col_acc_total, ultima_linha, MEDIA_ACC_TOTAL)
+    if col_acc_personalizada is not None:
+        if novo_input > 0:
+            formatos_colunas[col_acc_personalizada] = formatos['nota']
+            if ultima_linha:
+                _regras_media(worksheet, formatos, col_acc_personalizada, ultima_linha, novo_input)
+        else:
+            formatos_colunas[col_acc_personalizada] = formatos['centro']
+
+    # Tamanho de cada bloco de turma, para saber onde cada mesclagem termina
+    turmas = df['Class Name']
+    tamanho_blocos = turmas.groupby((turmas != turmas.shift()).cumsum(), sort=False).size().tolist()
+    blocos = iter(tamanho_blocos)
+
+    linha_fim_bloco = 0
+    formato_turma = None
+    # close() também quando a escrita é interrompida (ex.: tarefa cancelada pelo
+    # progresso), para não deixar os arquivos temporários do constant_memory abertos
+    try:
+        for linha, valores in enumerate(df.itertuples(index=False, name=None), start=1):
+            if linha > linha_fim_bloco:
+                # Primeira linha da turma: nome da turma e início da mesclagem
+                turma = valores[col_turma]
+                formato_turma = formatos['turmas'].get(turma, formatos['branco'])
+                linha_fim_bloco = linha + next(blocos) - 1
+                if linha_fim_bloco > linha:
+                    _mesclar(worksheet, linha, linha_fim_bloco, col_turma)
+            else:
+                valores = valores[:col_turma] + (None,) + valores[col_turma + 1:]
+
+            for col, valor in enumerate(valores):
+                formato = formatos_colunas[col] or formato_turma
+                if valor is None:
+                    worksheet.write_blank(linha, col, None, formato)
+                else:
+                    worksheet.write(linha, col, valor, formato)
+            if progresso is not None and linha % PASSO_PROGRESSO == 0:
+                progresso(linha / ultima_linha)
+    finally:
+        workbook.close()
+
+
+def nome_arquivo_turma(turma):
+    # Nome do arquivo baseado na turma (removendo caracteres especiais)
+    return turma.replace(' ', '_').replace('-', '_').replace('º', '').replace('°', '') + '.xlsx'
+
+
+def exportar_consolidado(df, novo_input=0, progresso=None):
+    # Planilha completa com todas as turmas
+    output = io.BytesIO()
+    mapeamento_cores = mapear_cores(df['Class Name'].unique())
+    _escrever_planilha(output, df, 'Dados_Consolidados', mapeamento_cores, novo_input, progresso)
+    return output.getvalue()
+
+
+def exportar_turma(df_turma, nome_turma, todas_turmas, novo_input=0):
+    # Planilha de uma turma; a cor segue a posição da turma na planilha completa
+    output = io.BytesIO()
+    mapeamento_cores = mapear_cores(todas_turmas)
+    _escrever_planilha(output, df_turma, nome_turma[:31], mapeamento_cores, novo_input)
+    return output.getvalue()
+
+
+def salvar_consolidado(df, caminho, novo_input=0):
+    mapeamento_cores = mapear_cores(df['Class Name'].unique())
+    _escrever_planilha(caminho, df, 'Dados_Consolidados', mapeamento_cores, novo_input)
+
+
+def _blocos_turmas(df):
+    # Percorre o df ordenado por turma uma única vez, entregando cada turma com as cores
+    mapeamento_cores = mapear_cores(df['Class Name'].unique())
+    df = df.sort_values('Class Name', kind='stable')
+    for turma, df_turma in df.groupby('Class Name', sort=False):
+        yield turma, df_turma, mapeamento_cores
+
+
+def salvar_turmas(df, pasta, novo_input=0):
+    # Grava uma planilha por turma na pasta, devolvendo cada turma conforme termina
+    for turma, df_turma, mapeamento_cores in _blocos_turmas(df):
+        caminho = os.path.join(pasta, nome_arquivo_turma(turma))
+        _escrever_planilha(caminho, df_turma, turma[:31], mapeamento_cores, novo_input)
+        yield turma
+
+
+def exportar_turmas_zip(df, novo_input=0):
+    # Um ZIP com a planilha de cada turma, gerado numa única passada pelo df ordenado
+    # por turma. Cada planilha é escrita direto dentro do ZIP, sem cópia intermediária.
+    output = io.BytesIO()
+    # As planilhas já são compactadas, então o ZIP só as armazena
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for turma, df_turma, mapeamento_cores in _blocos_turmas(df):
+            with zf.open(nome_arquivo_turma(turma), 'w') as destino:
+                _escrever_planilha(destino, df_turma, turma[:31], mapeamento_cores, novo_input)
+    return output.getvalue()
@@ -0,0 +1,362 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from diagnostico import medir
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # leitor opcional, bem mais rápido que o openpyxl
+    CalamineWorkbook = None
+
+
+ABA_PARTICIPANTES = 'Participant Data'
+COLUNAS_PARTICIPANTES = ['First Name', 'Last Name', 'Class Name', 'Accuracy']
+
+
+def nome_base_do_arquivo(nome_arquivo):
+    # O nome do quiz é tudo antes do primeiro "-" no nome do arquivo exportado
+    return nome_arquivo.split("-")[0]
+
+
+def eh_exportacao(nome_arquivo):
+    # Ignora arquivos temporários do Excel ("~$arquivo.xlsx")
+    nome = os.path.basename(nome_arquivo)
+    return nome.lower().endswith('.xlsx') and not nome.startswith('~$')
+
+
+def eh_zip(nome_arquivo):
+    return nome_arquivo.lower().endswith('.zip')
+
+
+def _membros_xlsx(zf):
+    # Exportações dentro do ZIP (em qualquer pasta), em ordem alfabética; as cópias
+    # "__MACOSX/._arquivo.xlsx" que o macOS cria ao compactar ficam de fora
+    return sorted(
+        info.filename for info in zf.infolist()
+        if not info.is_dir() and not info.filename.startswith('__MACOSX/') and eh_exportacao(info.filename)
+    )
+
+
+def membros_zip(arquivo_zip):
+    # arquivo_zip: caminho ou objeto de arquivo
+    with zipfile.ZipFile(arquivo_zip) as zf:
+        return _membros_xlsx(zf)
+
+
+def ler_zip(arquivo_zip):
+    # Gera (nome_base, conteudo) de cada exportação do ZIP. Os membros são
+    # descompactados um por vez, só quando pedidos, então só um fica em memória.
+    with zipfile.ZipFile(arquivo_zip) as zf:
+        for membro in _membros_xlsx(zf):
+            yield nome_base_do_arquivo(os.path.basename(membro)), zf.read(membro)
+
+
+def hash_conteudo(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def _linhas_openpyxl(conteudo):
+    # Modo somente leitura: as linhas são lidas em streaming, sem montar o DOM da planilha
+    wb = load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True)
+    try:
+        ws = wb[ABA_PARTICIPANTES]
+        ws.reset_dimensions()  # algumas exportações trazem a dimensão errada
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _linhas_calamine(conteudo):
+    wb = CalamineWorkbook.from_filelike(io.BytesIO(conteudo))
+    yield from wb.get_sheet_by_name(ABA_PARTICIPANTES).iter_rows()
+
+
+MOTORES_LEITURA = {'openpyxl': _linhas_openpyxl}
+if CalamineWorkbook is not None:
+    MOTORES_LEITURA['calamine'] = _linhas_calamine
+
+MOTOR_PADRAO = 'calamine' if 'calamine' in MOTORES_LEITURA else 'openpyxl'
+
+
+def _texto(valor):
+    # Mesma conversão do astype(str) sobre o que o pandas leria da célula
+    if valor is None or valor == '':
+        return 'nan'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _acuracia(valor):
+    # "85%" -> 85.0; células vazias viram NaN e não contam como tentativa
+    if valor is None or valor == '':
+        return float('nan')
+    if isinstance(valor, str):
+        return float(valor.replace('%', ''))
+    return float(valor)
+
+
+def ler_participant_data(conteudo, motor=None):
+    # Lê só as colunas usadas da aba 'Participant Data', já com Accuracy em float
+    linhas = MOTORES_LEITURA[motor or MOTOR_PADRAO](conteudo)
+    cabecalho = list(next(linhas, None) or [])
+    faltando = [c for c in COLUNAS_PARTICIPANTES if c not in cabecalho]
+    if faltando:
+        raise ValueError(f"Colunas ausentes na aba '{ABA_PARTICIPANTES}': {', '.join(faltando)}")
+    i_first, i_last, i_class, i_acc = (cabecalho.index(c) for c in COLUNAS_PARTICIPANTES)
+    largura = max(i_first, i_last, i_class, i_acc) + 1
+
+    first_names, last_names, classes, acuracias = [], [], [], []
+    for linha in linhas:
+        if len(linha) < largura:
+            linha = tuple(linha) + (None,) * (largura - len(linha))
+        if all(linha[i] is None or linha[i] == '' for i in (i_first, i_last, i_class, i_acc)):
+            continue  # linha em branco
+        first_names.append(_texto(linha[i_first]))
+        last_names.append(_texto(linha[i_last]))
+        turma = linha[i_class]
+        classes.append(None if turma == '' else turma)
+        acuracias.append(_acuracia(linha[i_acc]))
+
+    # Tipos explícitos para a aba sem nenhuma tentativa (quiz que ninguém fez ainda):
+    # listas vazias virariam float64 e o "Name" não poderia ser montado
+    return pd.DataFrame({
+        'First Name': pd.Series(first_names, dtype=str),
+        'Last Name': pd.Series(last_names, dtype=str),
+        'Class Name': pd.Series(classes, dtype=None if classes else object),
+        'Accuracy': pd.Series(acuracias, dtype='float64'),
+    })
+
+
+def agregar_participantes(df, nome_base):
+    # Agrega as tentativas de cada aluno: maior acurácia e número de tentativas.
+    # Agrupa primeiro pelas colunas originais, para montar o "Name" uma vez por aluno
+    # e não uma vez por tentativa.
+    col_acc, col_tentativa = f"Acc-{nome_base}", f"Tentativa-{nome_base}"
+    df = (
+        df.groupby(['Class Name', 'First Name', 'Last Name'])
+            .agg(**{col_acc: ('Accuracy', 'max'), col_tentativa: ('Accuracy', 'count')})
+            .reset_index()
+        )
+    df["Name"] = df["First Name"] + " " + df["Last Name"]
+    # Nomes iguais vindos de partes diferentes ("Ana" + "Maria Silva" e "Ana Maria" + "Silva")
+    # continuam sendo o mesmo aluno, como no agrupamento direto por Name
+    df = (
+        df.groupby(['Class Name', 'Name'])
+            .agg(**{col_acc: (col_acc, 'max'), col_tentativa: (col_tentativa, 'sum')})
+            .reset_index()
+        )
+    return df
+
+
+def agregar_quiz(conteudo, nome_base, motor=None):
+    return agregar_participantes(ler_participant_data(conteudo, motor), nome_base)
+
+
+class CacheQuizzes:
+    # Cache LRU dos quizzes já agregados, indexado pelo hash do conteúdo do arquivo.
+    # Assim, mudar um widget não faz reler todas as planilhas a cada rerun.
+
+    def __init__(self, max_itens=64):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def chave(conteudo, nome_base):
+        # O nome_base faz parte da chave porque define os nomes das colunas
+        return (hash_conteudo(conteudo), nome_base)
+
+    def buscar(self, chave):
+        with self._lock:
+            if chave not in self._itens:
+                return None
+            self._itens.move_to_end(chave)
+            # Cópia para que alterações no dfFinal não contaminem o cache
+            return self._itens[chave].copy()
+
+    def guardar(self, chave, df):
+        with self._lock:
+            self._itens[chave] = df
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+
+def criar_pool(trabalhadores):
+    # forkserver (ou spawn) em vez de fork: o processo principal pode ser um servidor
+    # com várias threads (Streamlit), e um fork feito enquanto outra thread segura um
+    # lock deixa o processo filho travado para sempre
+    metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=trabalhadores, mp_context=multiprocessing.get_context(metodo))
+
+
+def _resolver_trabalhadores(trabalhadores, tarefas=None):
+    # 0 usa todos os núcleos disponíveis; nunca mais processos do que arquivos
+    if trabalhadores == 0:
+        trabalhadores = os.cpu_count() or 1
+    return trabalhadores if tarefas is None else min(trabalhadores, tarefas)
+
+
+def _buscar_agregado(chave, cache, armazem):
+    # Procura primeiro no cache e depois no banco; devolve (df ou None, origem)
+    if cache is not None:
+        df = cache.buscar(chave)
+        if df is not None:
+            return df, 'cache'
+    if armazem is not None:
+        df = armazem.buscar(chave)
+        if df is not None:
+            if cache is not None:
+                cache.guardar(chave, df)
+                df = df.copy()
+            return df, 'banco'
+    return None, None
+
+
+def _guardar_agregado(chave, df, cache, armazem):
+    if armazem is not None:
+        armazem.guardar(chave, df)
+    if cache is not None:
+        cache.guardar(chave, df)
+        df = df.copy()
+    return df
+
+
+def agregar_em_fluxo(entradas, ja_agregadas=(), trabalhadores=1, cache=None, diagnostico=None,
+                     armazem=None, pool=None):
+    # entradas: iterável de (nome_base, conteudo) consumido aos poucos, como o ler_zip.
+    # Devolve as chaves de todas as entradas (na ordem) e {chave: quiz agregado} só das
+    # que não estão em ja_agregadas.
+    # trabalhadores=1 lê tudo em sequência; 0 usa todos os núcleos disponíveis.
+    # pool: um criar_pool() já aberto (ex.: um só para o app inteiro); sem ele, um pool
+    # é criado para a chamada inteira e fechado no fim.
+    # Com um Diagnostico, cada arquivo gera um registro com tempo e contagens.
+    # Com um ArmazemQuizzes, procura primeiro no cache, depois no banco e só então
+    # lê o XLSX; o que for lido fica guardado nos dois.
+    trabalhadores = _resolver_trabalhadores(trabalhadores)
+    medir_memoria = diagnostico is not None and diagnostico.medir_memoria
+    # Cada processo tem no máximo dois arquivos esperando; o conteúdo de um arquivo
+    # só fica em memória até ele ser lido
+    max_em_leitura = 2 * trabalhadores
+    chaves, novos = [], {}
+    em_leitura = {}  # chave -> (nome_base, conteudo, futuro), na ordem de envio
+
+    def registrar(nome_base, conteudo, df, origem, **metricas):
+        if diagnostico is not None:
+            diagnostico.registrar('arquivo', quiz=nome_base, bytes=len(conteudo), origem=origem,
+                                  linhas=len(df), celulas=df.size, **metricas)
+
+    def ler(chave, nome_base, conteudo, futuro=None):
+        nonlocal pool
+        resultado = None
+        if futuro is not None:
+            try:
+                resultado = futuro.result()
+            except (BrokenProcessPool, OSError):
+                pool = None  # sem processos disponíveis: segue em sequência
+        if resultado is None:
+            resultado = medir(agregar_quiz, conteudo, nome_base, medir_memoria=medir_memoria)
+        df, metricas = resultado
+        registrar(nome_base, conteudo, df, 'leitura', **metricas)
+        novos[chave] = _guardar_agregado(chave, df, cache, armazem)
+
+    with ExitStack() as pilha:
+        if trabalhadores <= 1:
+            pool = None
+        elif pool is None:
+            pool = pilha.enter_context(criar_pool(trabalhadores))
+
+        for nome_base, conteudo in entradas:
+            chave = CacheQuizzes.chave(conteudo, nome_base)
+            chaves.append(chave)
+            if chave in ja_agregadas or chave in novos or chave in em_leitura:
+                continue
+
+            df, origem = _buscar_agregado(chave, cache, armazem)
+            if df is not None:
+                registrar(nome_base, conteudo, df, origem)
+                novos[chave] = df
+                continue
+
+            futuro = None
+            if pool is not None:
+                try:
+                    futuro = pool.submit(medir, agregar_quiz, conteudo, nome_base, medir_memoria=medir_memoria)
+                except (BrokenProcessPool, OSError):
+                    pool = None
+            if futuro is None:
+                ler(chave, nome_base, conteudo)
+                continue
+            em_leitura[chave] = (nome_base, conteudo, futuro)
+            if len(em_leitura) >= max_em_leitura:
+                primeira = next(iter(em_leitura))
+                ler(primeira, *em_leitura.pop(primeira))
+
+        while em_leitura:
+            primeira = next(iter(em_leitura))
+            ler(primeira, *em_leitura.pop(primeira))
+    return chaves, novos
+
+
+def agregar_arquivos(arquivos, **opcoes):
+    # arquivos: lista de (nome_base, conteudo). O resultado sai sempre na ordem do
+    # upload, para manter a ordem das colunas. opcoes: as do agregar_em_fluxo.
+    chaves, novos = agregar_em_fluxo(arquivos, **opcoes)
+    return [novos[chave] for chave in chaves]
+
+
+@contextmanager
+def _abrir_origem(origem):
+    # origem: caminho de um .xlsx ou (caminho do ZIP, membro)
+    if isinstance(origem, tuple):
+        caminho_zip, membro = origem
+        with zipfile.ZipFile(caminho_zip) as zf, zf.open(membro) as arquivo:
+            yield arquivo
+    else:
+        with open(origem, 'rb') as arquivo:
+            yield arquivo
+
+
+def _nome_base_da_origem(origem):
+    caminho = origem[1] if isinstance(origem, tuple) else origem
+    return nome_base_do_arquivo(os.path.basename(caminho))
+
+
+def chave_da_origem(origem):
+    # Mesma chave do CacheQuizzes, lendo o arquivo em blocos em vez de inteiro
+    resumo = hashlib.sha256()
+    with _abrir_origem(origem) as arquivo:
+        for bloco in iter(lambda: arquivo.read(2**20), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest(), _nome_base_da_origem(origem)
+
+
+def _ler_e_agregar(origem):
+    with _abrir_origem(origem) as arquivo:
+        conteudo = arquivo.read()
+    return agregar_quiz(conteudo, _nome_base_da_origem(origem))
+
+
+def agregar_caminhos(caminhos, trabalhadores=1):
+    # Gera (caminho, df agregado) na ordem recebida. Cada processo abre o próprio
+    # arquivo, então só alguns arquivos ficam em memória por vez, mesmo com milhares.
+    # Um caminho também pode ser (caminho do ZIP, membro): ver membros_zip.
+    trabalhadores = _resolver_trabalhadores(trabalhadores, len(caminhos))
+    if trabalhadores > 1:
+        with criar_pool(trabalhadores) as pool:
+            yield from zip(caminhos, pool.map(_ler_e_agregar, caminhos))
+    else:
+        for caminho in caminhos:
+            yield caminho, _ler_e_agregar(caminho)
@@ -0,0 +1,54 @@
+import hashlib
+import threading
+
+import pandas as pd
+
+
+class TarefaCancelada(Exception):
+    pass
+
+
+class Tarefa:
+    # Executa funcao(*args, progresso=...) numa thread do executor. A função informa o
+    # andamento chamando progresso(fração); se a tarefa foi cancelada, essa mesma
+    # chamada lança TarefaCancelada e interrompe o trabalho no meio.
+
+    def __init__(self, executor, chave, funcao, *args):
+        self.chave = chave
+        self.progresso = 0.0
+        self._cancelada = threading.Event()
+        self._futuro = executor.submit(funcao, *args, progresso=self._informar)
+
+    def _informar(self, fracao):
+        if self._cancelada.is_set():
+            raise TarefaCancelada()
+        self.progresso = fracao
+
+    def cancelar(self):
+        self._cancelada.set()
+        self._futuro.cancel()  # se ainda estiver na fila, nem começa
+
+    def pronta(self):
+        return self._futuro.done()
+
+    def resultado(self):
+        return self._futuro.result()
+
+
+def tarefa_atual(estado, nome, chave, executor, funcao, *args):
+    # Devolve a tarefa `nome` guardada em estado (ex.: st.session_state) se ela foi
+    # criada com a mesma chave; senão cancela a antiga e começa outra. Assim, mudar
+    # os valores várias vezes seguidas não empilha trabalho no executor.
+    tarefa = estado.get(nome)
+    if tarefa is None or tarefa.chave != chave:
+        if tarefa is not None:
+            tarefa.cancelar()
+        tarefa = Tarefa(executor, chave, funcao, *args)
+        estado[nome] = tarefa
+    return tarefa
+
+
+def assinatura(df):
+    # Muda sempre que muda algum valor, coluna ou a ordem das linhas
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes() + repr(list(df.columns)).encode()).hexdigest()
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from armazenamento import ArmazemQuizzes
+from benchmarks.gerador import gerar_alunos, gerar_exportacao
+from leitura import CacheQuizzes, agregar_quiz
+
+
+@pytest.fixture
+def armazem(tmp_path):
+    armazem = ArmazemQuizzes(str(tmp_path / 'dados' / 'quizzes.sqlite'), max_quizzes=3)
+    yield armazem
+    armazem.fechar()
+
+
+def _quiz(nome_base, semente=0):
+    conteudo = gerar_exportacao(gerar_alunos(2, 6), ausentes=0.3, semente=semente)
+    return CacheQuizzes.chave(conteudo, nome_base), agregar_quiz(conteudo, nome_base)
+
+
+def test_quiz_volta_igual_do_banco(armazem):
+    chave, df = _quiz('Quiz 1')
+    assert armazem.buscar(chave) is None
+
+    armazem.guardar(chave, df)
+    assert chave in armazem
+    pd.testing.assert_frame_equal(armazem.buscar(chave), df)
+    # Quiz que ninguém fez ainda: nenhuma linha, mas as mesmas colunas
+    vazio = agregar_quiz(gerar_exportacao([]), 'Quiz 2')
+    armazem.guardar(('vazio', 'Quiz 2'), vazio)
+    assert list(armazem.buscar(('vazio', 'Quiz 2')).columns) == list(vazio.columns)
+
+    # Reabrir o arquivo mantém o que foi salvo
+    outro = ArmazemQuizzes(armazem.caminho)
+    pd.testing.assert_frame_equal(outro.buscar(chave), df)
+    outro.fechar()
+
+
+def test_remover_e_limite_do_banco(armazem):
+    quizzes = [_quiz(f"Quiz {q}", semente=q) for q in range(5)]
+    for chave, df in quizzes:
+        armazem.guardar(chave, df)
+
+    # Só os 3 mais recentes ficam, do mais novo para o mais antigo
+    assert list(armazem.listar()['nome_base']) == ['Quiz 4', 'Quiz 3', 'Quiz 2']
+    assert armazem.buscar(quizzes[0][0]) is None
+
+    armazem.remover(quizzes[3][0])
+    assert quizzes[3][0] not in armazem
+    assert armazem.buscar(quizzes[3][0]) is None
+    assert list(armazem.listar()['nome_base']) == ['Quiz 4', 'Quiz 2']
@@ -0,0 +1,43 @@
+import os
+import zipfile
+
+from openpyxl import load_workbook
+
+from benchmarks.gerador import gerar_exportacoes
+from cli import listar_arquivos, main
+
+
+def _pasta_com_zip(tmp_path):
+    # Mesmas exportações soltas na pasta e dentro de um ZIP
+    pasta = tmp_path / 'exportacoes'
+    pasta.mkdir()
+    exportacoes = gerar_exportacoes(turmas=2, alunos_por_turma=5, quizzes=2)
+    for nome, conteudo in exportacoes:
+        (pasta / nome).write_bytes(conteudo)
+    caminho_zip = tmp_path / 'exportacoes.zip'
+    with zipfile.ZipFile(caminho_zip, 'w') as zf:
+        for nome, conteudo in exportacoes:
+            zf.writestr(f"exportacoes/{nome}", conteudo)
+    return pasta, caminho_zip
+
+
+def test_listar_arquivos_ignora_exportacao_repetida(tmp_path):
+    pasta, caminho_zip = _pasta_com_zip(tmp_path)
+    so_pasta = listar_arquivos([str(pasta)])
+    assert len(so_pasta) == 2
+    assert listar_arquivos([str(pasta), str(caminho_zip)]) == so_pasta
+    assert [membro for _, membro in listar_arquivos([str(caminho_zip)])] == [
+        f"exportacoes/{os.path.basename(c)}" for c in so_pasta
+    ]
+
+
+def test_main_nao_soma_tentativas_repetidas(tmp_path):
+    pasta, caminho_zip = _pasta_com_zip(tmp_path)
+    for entradas, saida in (([pasta], 'uma'), ([pasta, caminho_zip], 'duas')):
+        assert main([*map(str, entradas), '-o', str(tmp_path / saida), '-j', '1', '--sem-turmas']) == 0
+
+    def valores(saida):
+        ws = load_workbook(tmp_path / saida / 'dados_consolidados.xlsx').active
+        return [linha for linha in ws.iter_rows(values_only=True)]
+
+    assert valores('duas') == valores('uma')
@@ -0,0 +1,132 @@
+import io
+from functools import reduce
+
+import pandas as pd
+import pytest
+
+from benchmarks.gerador import gerar_alunos, gerar_exportacao
+from consolidacao import ConsolidacaoIncremental, consolidar
+from leitura import MOTORES_LEITURA, CacheQuizzes, agregar_quiz
+
+
+def consolidar_antigo(exportacoes):
+    # Pipeline original do app: pd.read_excel + reduce(pd.merge) + fillna(0) + ACC Total
+    dataframes = []
+    for nome_base, conteudo in exportacoes:
+        df = pd.read_excel(io.BytesIO(conteudo), sheet_name='Participant Data')
+        df["Name"] = df["First Name"].astype(str) + " " + df["Last Name"].astype(str)
+        df = df[['Class Name', "Name", 'Accuracy']]
+        df['Accuracy'] = df['Accuracy'].astype(str).str.replace('%', '').astype(float)
+        df = (
+            df.groupby(['Class Name', 'Name'])
+                .agg(**{f"Acc-{nome_base}": ('Accuracy', 'max'),
+                        f"Tentativa-{nome_base}": ('Accuracy', 'count')})
+                .reset_index()
+            )
+        dataframes.append(df)
+
+    dfFinal = reduce(lambda left, right: pd.merge(left, right, on=["Class Name", "Name"], how="outer"), dataframes)
+    dfFinal.fillna(0, inplace=True)
+    colunas_acc = [col for col in dfFinal.columns if col.startswith('Acc-')]
+    dfFinal['ACC Total'] = dfFinal[colunas_acc].mean(axis=1, skipna=True).round(2)
+    return dfFinal
+
+
+def _sem_turma(alunos):
+    # Quiz compartilhado por link: ninguém tem Class Name
+    return [('', primeiro_nome, sobrenome) for _, primeiro_nome, sobrenome in alunos]
+
+
+CENARIOS = {
+    # Mesmos alunos em todos os quizzes, sem faltas
+    'turmas_iguais': lambda: [
+        (f"Q{q}", gerar_exportacao(gerar_alunos(3, 8), ausentes=0, semente=q)) for q in range(3)
+    ],
+    # Turmas que só aparecem em alguns quizzes (rosters sobrepostos)
+    'turmas_sobrepostas': lambda: [
+        (f"Q{q}", gerar_exportacao(gerar_alunos(2 + q, 6)[q * 6:], semente=q)) for q in range(3)
+    ],
+    # Alunos que não fizeram alguns quizzes
+    'alunos_ausentes': lambda: [
+        (f"Q{q}", gerar_exportacao(gerar_alunos(4, 10), ausentes=0.4, semente=q)) for q in range(4)
+    ],
+    # Um quiz em que nenhuma linha tem turma: o agregado fica vazio
+    'quiz_vazio': lambda: [
+        ("Q0", gerar_exportacao(gerar_alunos(2, 5), semente=1)),
+        ("Q1", gerar_exportacao(_sem_turma(gerar_alunos(2, 5)), semente=2)),
+        ("Q2", gerar_exportacao(gerar_alunos(2, 5), semente=3)),
+    ],
+    # Quiz que ninguém fez ainda: a aba só tem o cabeçalho
+    'quiz_sem_tentativas': lambda: [
+        ("Q0", gerar_exportacao(gerar_alunos(2, 5), semente=1)),
+        ("Q1", gerar_exportacao([])),
+    ],
+}
+
+
+@pytest.fixture(params=list(CENARIOS))
+def exportacoes(request):
+    return CENARIOS[request.param]()
+
+
+def _agregados(exportacoes):
+    return [agregar_quiz(conteudo, nome_base) for nome_base, conteudo in exportacoes]
+
+
+def test_consolidar_igual_ao_merge_antigo(exportacoes):
+    esperado = consolidar_antigo(exportacoes)
+    pd.testing.assert_frame_equal(consolidar(_agregados(exportacoes)), esperado)
+
+
+def test_consolidacao_incremental_igual_ao_merge_antigo(exportacoes):
+    chaves = [CacheQuizzes.chave(conteudo, nome_base) for nome_base, conteudo in exportacoes]
+    agregados = dict(zip(chaves, _agregados(exportacoes)))
+
+    # Os quizzes chegam um de cada vez, como em uploads sucessivos
+    consolidacao = ConsolidacaoIncremental()
+    for i in range(1, len(chaves) + 1):
+        consolidacao.atualizar(chaves[:i], {chaves[i - 1]: agregados[chaves[i - 1]]})
+    pd.testing.assert_frame_equal(consolidacao.tabela(), consolidar_antigo(exportacoes))
+
+    # Remover o último quiz refaz só as colunas, mas o resultado é o mesmo
+    consolidacao.atualizar(chaves[:-1])
+    pd.testing.assert_frame_equal(consolidacao.tabela(), consolidar_antigo(exportacoes[:-1]))
+
+
+@pytest.mark.parametrize('motor', list(MOTORES_LEITURA))
+def test_aba_sem_tentativas(motor):
+    agregado = agregar_quiz(gerar_exportacao([]), 'Q1', motor)
+    assert list(agregado.columns) == ['Class Name', 'Name', 'Acc-Q1', 'Tentativa-Q1']
+    assert agregado.empty
+
+
+def test_quiz_repetido_igual_nos_dois_caminhos():
+    # Dois arquivos do mesmo quiz (ex.: turmas exportadas separadamente) viram um só
+    alunos = gerar_alunos(3, 6)
+    exportacoes = [
+        ("Q0", gerar_exportacao(alunos, semente=1)),
+        ("Q1", gerar_exportacao(alunos[:10], semente=2)),
+        ("Q1", gerar_exportacao(alunos[6:], semente=3)),
+    ]
+    chaves = [CacheQuizzes.chave(conteudo, nome_base) for nome_base, conteudo in exportacoes]
+    agregados = _agregados(exportacoes)
+
+    consolidacao = ConsolidacaoIncremental()
+    consolidacao.atualizar(chaves, dict(zip(chaves, agregados)))
+    esperado = consolidar(agregados)
+    pd.testing.assert_frame_equal(consolidacao.tabela(), esperado)
+
+    q1 = esperado.set_index(['Class Name', 'Name'])['Tentativa-Q1']
+    repetidos = pd.concat(agregados[1:]).groupby(['Class Name', 'Name'])['Tentativa-Q1'].sum()
+    assert (q1.loc[repetidos.index] == repetidos).all()
+
+
+def test_mesmo_arquivo_duas_vezes_conta_uma_vez():
+    # Ex.: o mesmo arquivo escolhido duas vezes, ou solto e de novo dentro de um ZIP
+    exportacoes = CENARIOS['alunos_ausentes']()
+    chaves = [CacheQuizzes.chave(conteudo, nome_base) for nome_base, conteudo in exportacoes]
+    agregados = dict(zip(chaves, _agregados(exportacoes)))
+
+    consolidacao = ConsolidacaoIncremental()
+    consolidacao.atualizar(chaves + chaves[:1], agregados)
+    pd.testing.assert_frame_equal(consolidacao.tabela(), consolidar_antigo(exportacoes))
@@ -0,0 +1,55 @@
+import threading
+
+from diagnostico import Diagnostico
+
+
+def test_etapas_na_mesma_thread_sao_exatas():
+    diagnostico = Diagnostico(medir_memoria=True)
+    with diagnostico.etapa('fora'):
+        with diagnostico.etapa('dentro'):
+            dados = [0] * 200_000
+        del dados
+    fora, dentro = diagnostico.registros[1], diagnostico.registros[0]
+    assert dentro['pico_memoria_mb'] > 1
+    assert fora['pico_memoria_mb'] >= dentro['pico_memoria_mb']
+    assert 'memoria_aproximada' not in fora and 'memoria_aproximada' not in dentro
+
+
+def test_etapas_sobrepostas_entre_threads_sao_aproximadas():
+    diagnostico = Diagnostico(medir_memoria=True)
+    iniciou, terminar = threading.Event(), threading.Event()
+
+    def em_segundo_plano():
+        with diagnostico.etapa('exportacao'):
+            iniciou.set()
+            terminar.wait(5)
+
+    thread = threading.Thread(target=em_segundo_plano)
+    thread.start()
+    iniciou.wait(5)
+    with diagnostico.etapa('consolidacao'):
+        pass
+    terminar.set()
+    thread.join()
+    with diagnostico.etapa('depois'):
+        pass
+
+    registros = {r['etapa']: r for r in diagnostico.registros}
+    assert registros['consolidacao']['memoria_aproximada']
+    assert registros['exportacao']['memoria_aproximada']
+    assert 'memoria_aproximada' not in registros['depois']
+
+
+def test_registros_da_sessao_sao_limitados():
+    diagnostico = Diagnostico(max_registros=3)
+    diagnostico.nova_execucao()
+    exportar = diagnostico.instrumentar('exportacao', lambda: b'xlsx')
+    for i in range(3):
+        diagnostico.registrar('arquivo', quiz=f"Q{i}")
+    diagnostico.nova_execucao()
+    exportar()  # ex.: clique no botão depois de um rerun
+
+    tabela = diagnostico.tabela()
+    assert list(tabela['etapa']) == ['arquivo', 'arquivo', 'exportacao']
+    assert list(tabela['execucao']) == [1, 1, 1]
+    assert tabela['bytes'].iloc[-1] == 4
@@ -0,0 +1,96 @@
+import gc
+import io
+import warnings
+import zipfile
+
+import pytest
+from openpyxl import load_workbook
+
+from benchmarks.gerador import gerar_alunos, gerar_exportacao
+from consolidacao import aplicar_porcentagem, consolidar
+from exportacao import PASSO_PROGRESSO, exportar_consolidado, exportar_turma
+from leitura import agregar_quiz
+
+
+def _dfFinal(alunos_por_turma=6):
+    alunos = gerar_alunos(3, alunos_por_turma)
+    dataframes = [agregar_quiz(gerar_exportacao(alunos, semente=q), f"Q{q}") for q in range(2)]
+    return aplicar_porcentagem(consolidar(dataframes), 30)
+
+
+def _planilha(conteudo):
+    return load_workbook(io.BytesIO(conteudo)).active
+
+
+def _blocos_esperados(turmas):
+    # (primeira linha, última linha) de cada turma, em linhas do Excel (cabeçalho = 1)
+    blocos, inicio = [], 0
+    for i in range(1, len(turmas) + 1):
+        if i == len(turmas) or turmas[i] != turmas[inicio]:
+            blocos.append((inicio + 2, i + 1))
+            inicio = i
+    return blocos
+
+
+def test_consolidado_mescla_cada_turma():
+    dfFinal = _dfFinal()
+    ws = _planilha(exportar_consolidado(dfFinal, 20))
+
+    mescladas = sorted((r.min_row, r.max_row) for r in ws.merged_cells.ranges)
+    assert mescladas == [b for b in _blocos_esperados(list(dfFinal['Class Name'])) if b[0] < b[1]]
+    assert {r.min_col for r in ws.merged_cells.ranges} == {1}
+
+    # Nenhuma célula some por causa da mesclagem no modo constant_memory
+    for linha, nome in enumerate(dfFinal['Name'], start=2):
+        assert ws.cell(linha, 2).value == nome
+    for primeira, _ in _blocos_esperados(list(dfFinal['Class Name'])):
+        assert ws.cell(primeira, 1).value == dfFinal['Class Name'].iloc[primeira - 2]
+
+
+def test_turma_mescla_o_bloco_inteiro():
+    dfFinal = _dfFinal()
+    turmas = dfFinal['Class Name'].unique()
+    df_turma = dfFinal[dfFinal['Class Name'] == turmas[1]]
+    ws = _planilha(exportar_turma(df_turma, turmas[1], turmas))
+
+    assert [str(r) for r in ws.merged_cells.ranges] == [f"A2:A{len(df_turma) + 1}"]
+    assert ws['A2'].value == turmas[1]
+
+
+class Cancelada(Exception):
+    pass
+
+
+def test_exportacao_interrompida_fecha_a_planilha():
+    dfFinal = _dfFinal(alunos_por_turma=PASSO_PROGRESSO)
+    fracoes = []
+
+    def progresso(fracao):
+        fracoes.append(fracao)
+        raise Cancelada()
+
+    with warnings.catch_warnings(record=True) as avisos:
+        warnings.simplefilter('always')
+        with pytest.raises(Cancelada):
+            exportar_consolidado(dfFinal, progresso=progresso)
+        gc.collect()
+
+    assert fracoes == [PASSO_PROGRESSO / len(dfFinal)]
+    assert not [a for a in avisos if issubclass(a.category, ResourceWarning)]
+
+
+def test_cor_da_turma_so_dentro_da_tabela():
+    # Formato de linha (customFormat) pintaria a linha inteira até a coluna XFD
+    dfFinal = _dfFinal()
+    conteudo = exportar_consolidado(dfFinal, 20)
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+        assert b'customFormat' not in zf.read('xl/worksheets/sheet1.xml')
+
+    ws = _planilha(conteudo)
+    ultima_coluna = len(dfFinal.columns)
+    for linha in range(2, len(dfFinal) + 2):
+        assert ws.cell(linha, 2).fill.fgColor.rgb != '00000000'
+        assert ws.cell(linha, 2).border.left.style == 'thin'
+        assert ws.cell(linha, ultima_coluna + 1).fill.fgColor.rgb == '00000000'
+    for primeira, _ in _blocos_esperados(list(dfFinal['Class Name'])):
+        assert ws.cell(primeira, 1).fill.fgColor.rgb == ws.cell(primeira, 2).fill.fgColor.rgb
@@ -0,0 +1,126 @@
+import io
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import leitura
+from benchmarks.gerador import gerar_alunos, gerar_exportacao
+from leitura import CacheQuizzes, agregar_arquivos, agregar_em_fluxo, agregar_quiz, criar_pool, ler_zip, membros_zip
+
+
+def _zip(membros):
+    conteudo = io.BytesIO()
+    with zipfile.ZipFile(conteudo, 'w') as zf:
+        for nome, dados in membros.items():
+            if nome.endswith('/'):
+                zf.mkdir(nome.rstrip('/'))
+            else:
+                zf.writestr(nome, dados)
+    conteudo.seek(0)
+    return conteudo
+
+
+@pytest.fixture
+def exportacao():
+    return gerar_exportacao(gerar_alunos(2, 4))
+
+
+def test_membros_zip_filtra_e_ordena(exportacao):
+    arquivo = _zip({
+        'turmas/': b'',
+        'turmas/Quiz 2-participant-data.xlsx': exportacao,
+        'Quiz 1-participant-data.XLSX': exportacao,
+        'turmas/~$Quiz 2-participant-data.xlsx': b'lock do Excel',
+        '__MACOSX/turmas/._Quiz 2-participant-data.xlsx': b'metadados',
+        'turmas/leia-me.txt': b'texto',
+    })
+    assert membros_zip(arquivo) == ['Quiz 1-participant-data.XLSX', 'turmas/Quiz 2-participant-data.xlsx']
+
+
+def test_ler_zip_usa_o_nome_do_membro(exportacao):
+    arquivo = _zip({
+        'turmas/Quiz 2-participant-data.xlsx': exportacao,
+        'Quiz 1-participant-data.xlsx': exportacao,
+    })
+    lidos = list(ler_zip(arquivo))
+    assert [nome_base for nome_base, _ in lidos] == ['Quiz 1', 'Quiz 2']
+    assert all(conteudo == exportacao for _, conteudo in lidos)
+    assert list(agregar_quiz(lidos[1][1], lidos[1][0]).columns)[2:] == ['Acc-Quiz 2', 'Tentativa-Quiz 2']
+
+
+@pytest.mark.parametrize('membros', [{}, {'__MACOSX/._Quiz 1-x.xlsx': b'x', 'leia-me.txt': b'x'}])
+def test_zip_sem_exportacoes(membros):
+    assert membros_zip(_zip(membros)) == []
+    assert list(ler_zip(_zip(membros))) == []
+
+
+def test_cache_descarta_o_menos_usado():
+    cache = CacheQuizzes(max_itens=2)
+    frames = {chave: pd.DataFrame({'x': [i]}) for i, chave in enumerate('abc')}
+    cache.guardar('a', frames['a'])
+    cache.guardar('b', frames['b'])
+    cache.buscar('a')  # "a" passa a ser o mais recente
+    cache.guardar('c', frames['c'])
+
+    assert cache.buscar('b') is None
+    pd.testing.assert_frame_equal(cache.buscar('a'), frames['a'])
+    pd.testing.assert_frame_equal(cache.buscar('c'), frames['c'])
+
+
+def _arquivos():
+    # Tamanhos bem diferentes, para os processos terminarem fora de ordem
+    return [
+        (f"Q{q}", gerar_exportacao(gerar_alunos(1 + 3 * (q % 2), 20), semente=q)) for q in range(6)
+    ]
+
+
+def test_leitura_paralela_na_ordem_do_upload():
+    arquivos = _arquivos()
+    esperado = agregar_arquivos(arquivos)
+    with criar_pool(2) as pool:
+        for resultado in (agregar_arquivos(arquivos, trabalhadores=2),
+                          agregar_arquivos(arquivos, trabalhadores=2, pool=pool)):
+            assert len(resultado) == len(esperado)
+            for df, df_esperado in zip(resultado, esperado):
+                pd.testing.assert_frame_equal(df, df_esperado)
+
+
+class PoolContado(ThreadPoolExecutor):
+    # Conta os arquivos enviados e ainda não devolvidos ao agregar_em_fluxo
+    def __init__(self, trabalhadores):
+        super().__init__(trabalhadores)
+        self.pendentes = self.max_pendentes = 0
+        self._lock = threading.Lock()
+
+    def submit(self, *args, **kwargs):
+        with self._lock:
+            self.pendentes += 1
+            self.max_pendentes = max(self.max_pendentes, self.pendentes)
+        futuro = super().submit(*args, **kwargs)
+        resultado = futuro.result
+
+        def devolver(timeout=None):
+            with self._lock:
+                self.pendentes -= 1
+            return resultado(timeout)
+        futuro.result = devolver
+        return futuro
+
+
+def test_fluxo_usa_um_pool_e_limita_os_pendentes(monkeypatch):
+    # Os repetidos não são lidos de novo
+    arquivos = _arquivos() * 2 + [(f"Z{q}", conteudo) for q, (_, conteudo) in enumerate(_arquivos())]
+    pools = []
+    monkeypatch.setattr(leitura, 'criar_pool', lambda trabalhadores: pools.append(PoolContado(trabalhadores)) or pools[-1])
+
+    chaves, novos = agregar_em_fluxo(iter(arquivos), trabalhadores=2)
+
+    assert len(pools) == 1
+    assert pools[0].max_pendentes == 2 * 2
+    assert chaves == [CacheQuizzes.chave(conteudo, nome_base) for nome_base, conteudo in arquivos]
+    for nome_base, conteudo in arquivos:
+        pd.testing.assert_frame_equal(novos[CacheQuizzes.chave(conteudo, nome_base)],
+                                      agregar_quiz(conteudo, nome_base))
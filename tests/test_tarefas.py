@@ -0,0 +1,74 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from diagnostico import Diagnostico
+from tarefas import TarefaCancelada, assinatura, tarefa_atual
+
+
+def _trabalho(comecou, continuar, progresso):
+    # Informa o progresso aos poucos, como o _escrever_planilha
+    comecou.set()
+    for passo in range(100):
+        continuar.wait(5)
+        progresso(passo / 100)
+    return b'planilha'
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def test_tarefa_cancelada_para_no_meio(executor):
+    diagnostico = Diagnostico()
+    comecou, continuar = threading.Event(), threading.Event()
+    estado = {}
+    tarefa = tarefa_atual(estado, 'exportacao', 'a', executor,
+                          diagnostico.instrumentar('exportacao', _trabalho), comecou, continuar)
+    comecou.wait(5)
+    tarefa.cancelar()
+    continuar.set()
+
+    with pytest.raises(TarefaCancelada):
+        tarefa.resultado()
+    assert tarefa.pronta()
+    assert tarefa.progresso < 1
+    registro, = diagnostico.registros
+    assert registro['etapa'] == 'exportacao' and registro['interrompida'] == 'TarefaCancelada'
+
+
+def test_mesma_chave_reaproveita_a_tarefa(executor):
+    comecou, continuar = threading.Event(), threading.Event()
+    continuar.set()
+    estado = {}
+    primeira = tarefa_atual(estado, 'exportacao', 'a', executor, _trabalho, comecou, continuar)
+    segunda = tarefa_atual(estado, 'exportacao', 'a', executor, _trabalho, comecou, continuar)
+
+    assert segunda is primeira
+    assert segunda.resultado() == b'planilha'
+
+
+def test_chave_nova_cancela_a_anterior(executor):
+    comecou, continuar = threading.Event(), threading.Event()
+    estado = {}
+    antiga = tarefa_atual(estado, 'exportacao', 'a', executor, _trabalho, comecou, continuar)
+    comecou.wait(5)
+    nova = tarefa_atual(estado, 'exportacao', 'b', executor, _trabalho, threading.Event(), continuar)
+    continuar.set()
+
+    assert estado['exportacao'] is nova
+    with pytest.raises(TarefaCancelada):
+        antiga.resultado()
+    assert nova.resultado() == b'planilha'
+
+
+def test_assinatura_muda_com_valores_e_ordem():
+    df = pd.DataFrame({'Name': ['Ana', 'Bia'], 'Acc': [90.0, 80.0]})
+    assert assinatura(df) == assinatura(df.copy())
+    assert assinatura(df) != assinatura(df.assign(Acc=[90.0, 81.0]))
+    assert assinatura(df) != assinatura(df.iloc[::-1])
+    assert assinatura(df) != assinatura(df.rename(columns={'Acc': 'Acc-Q1'}))